@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from io import BytesIO
+from urllib.parse import unquote_to_bytes, urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+from django.urls import Resolver404, resolve
+from rest_framework.views import APIView
+
+from .process_local import ProcessLocal
+from .utils import Utils
+
+logger = Utils.init_logger(__name__)
+
+
+class BatchRequests(object):
+    """
+    Runs the sub-requests of a batch through the API views, in a per worker thread pool of
+    BATCH_POOL_SIZE threads. Each batch runs at most BATCH_MAX_CONCURRENCY of them at once and
+    they all share the authentication of the batch request, so the views use the same pooled
+    reddit instance. The ones not done in BATCH_TIMEOUT seconds get a 504.
+    """
+
+    METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+    _executor = ProcessLocal()
+
+    @staticmethod
+    def _error(code, message):
+        # Same body as the custom_json_exception_handler responses
+        return {'status': code, 'body': {'error': {'code': code, 'messages': [message]}}}
+
+    @classmethod
+    def run(cls, request, items):
+        """
+        Returns a {'status', 'body'} dict for each of the items (method, path and body of a
+        sub-request), in the same order. The bodies are the ones the endpoints would return.
+        """
+        # Read from the batch request here, it's not shared with the threads
+        context = {
+            'user': request.user,
+            'auth': request.auth,
+            'environ': {
+                'wsgi.url_scheme': request.scheme,
+                'SCRIPT_NAME': request.META.get('SCRIPT_NAME', ''),
+                'SERVER_NAME': request.META.get('SERVER_NAME'),
+                'SERVER_PORT': request.META.get('SERVER_PORT'),
+                'HTTP_HOST': request.get_host(),
+                'REMOTE_ADDR': request.META.get('REMOTE_ADDR'),
+            },
+        }
+        deadline = time.monotonic() + settings.BATCH_TIMEOUT
+        executor = cls._executor.get(
+            lambda: ThreadPoolExecutor(
+                max_workers=settings.BATCH_POOL_SIZE, thread_name_prefix='batch'
+            )
+        )
+        results = [None] * len(items)
+        pending = {}
+        next_index = 0
+        while next_index < len(items) or pending:
+            while next_index < len(items) and len(pending) < settings.BATCH_MAX_CONCURRENCY:
+                future = executor.submit(cls._run_item, context, items[next_index])
+                pending[future] = next_index
+                next_index += 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+
+        # The ones already running just finish in background, their results are discarded
+        for future in pending:
+            future.cancel()
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = cls._error(504, 'detail: Batch time budget exceeded.')
+        return results
+
+    @classmethod
+    def _run_item(cls, context, item):
+        # Same as Django does around every request, the pool threads are long lived
+        close_old_connections()
+        try:
+            return cls._dispatch(context, item)
+        except Exception as ex:
+            logger.error(
+                f'Error in batch sub-request {item.get("method")} {item.get("path")}. '
+                f'Exception raised: {repr(ex)}.'
+            )
+            # The exception details are only logged, never returned to the client
+            return cls._error(500, 'detail: Error running the sub-request.')
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def _dispatch(cls, context, item):
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        if method not in cls.METHODS:
+            return cls._error(405, f'detail: Method "{method}" not allowed in a batch.')
+        if not isinstance(path, str) or not path.startswith('/'):
+            return cls._error(400, 'detail: The path must be a string starting with /.')
+
+        sub_request = cls._make_request(context, method, path, item.get('body'))
+        try:
+            match = resolve(sub_request.path_info)
+        except Resolver404:
+            match = None
+        view_class = getattr(match.func, 'cls', None) if match else None
+        # Only the API endpoints, and no batches inside batches
+        if (
+            view_class is None
+            or not issubclass(view_class, APIView)
+            or match.url_name == 'batch'
+        ):
+            return cls._error(404, f'detail: No endpoint found for the path {path}.')
+
+        # The batch request is already authenticated, the views don't do it again
+        sub_request._force_auth_user = context['user']
+        sub_request._force_auth_token = context['auth']
+
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        response.render()
+        return {
+            'status': response.status_code,
+            'body': json.loads(response.content) if response.content else None,
+        }
+
+    @staticmethod
+    def _make_request(context, method, path, body):
+        # Same WSGI environ the server would give for the sub-request, with the body as JSON
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        url = urlsplit(path)
+        environ = dict(
+            context['environ'],
+            REQUEST_METHOD=method,
+            # WSGI servers give the path unquoted and latin-1 decoded
+            PATH_INFO=unquote_to_bytes(url.path).decode('iso-8859-1'),
+            QUERY_STRING=url.query,
+            CONTENT_TYPE='application/json',
+            CONTENT_LENGTH=str(len(data)),
+            HTTP_ACCEPT='application/json',
+        )
+        environ['wsgi.input'] = BytesIO(data)
+        return WSGIRequest(environ)
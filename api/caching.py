@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class LocalCache(object):
+    """
+    Per worker LRU kept in front of the shared cache. Values are kept pickled, so every get
+    returns a new copy and the size of each entry is known: the LRU is bounded by the total bytes
+    of its values (CACHE_LOCAL_MAX_BYTES), and the values bigger than CACHE_LOCAL_MAX_ITEM_BYTES
+    are only kept in the shared cache.
+    """
+
+    _entries = OrderedDict()
+    _size = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, key):
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires_at'] <= time.monotonic():
+                cls._remove(key)
+                return None
+            cls._entries.move_to_end(key)
+            data = entry['data']
+        return pickle.loads(data)
+
+    @classmethod
+    def set(cls, key, value, ttl):
+        if ttl <= 0:
+            cls.delete(key)
+            return
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > settings.CACHE_LOCAL_MAX_ITEM_BYTES:
+            cls.delete(key)
+            return
+        with cls._lock:
+            cls._remove(key)
+            cls._entries[key] = {'data': data, 'expires_at': time.monotonic() + ttl}
+            cls._size += len(data)
+            while cls._size > settings.CACHE_LOCAL_MAX_BYTES:
+                cls._remove(next(iter(cls._entries)))
+
+    @classmethod
+    def delete(cls, key):
+        with cls._lock:
+            cls._remove(key)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._size = 0
+
+    @classmethod
+    def _remove(cls, key):
+        # The lock must be held
+        entry = cls._entries.pop(key, None)
+        if entry is not None:
+            cls._size -= len(entry['data'])
+
+
+class CacheNamespace(object):
+    """
+    Two tier cache for one kind of values: the per worker LocalCache in front of the shared
+    cache (Redis), so the hot keys are served without a round trip to Redis.
+
+    ttl is the seconds the values are kept in the shared cache, either a number or the name of
+    the setting with it. local_ttl (CACHE_LOCAL_TTL by default) bounds how long a worker may keep
+    serving a value another worker changed or deleted, use 0 to skip the local tier.
+    Keys are versioned with the namespace version, bump it when the values format changes.
+    None means no value, never store it.
+    """
+
+    def __init__(self, name, ttl, local_ttl=None, version=1):
+        self.name = name
+        self.version = version
+        self._ttl = ttl
+        self._local_ttl = local_ttl
+
+    @property
+    def ttl(self):
+        return getattr(settings, self._ttl) if isinstance(self._ttl, str) else self._ttl
+
+    def _local_ttl_for(self, ttl):
+        local_ttl = settings.CACHE_LOCAL_TTL if self._local_ttl is None else self._local_ttl
+        if isinstance(local_ttl, str):
+            local_ttl = getattr(settings, local_ttl)
+        return min(local_ttl, ttl)
+
+    def _key(self, key):
+        return f'{self.name}:{key}'
+
+    def _local_key(self, key):
+        return f'{self.name}:{self.version}:{key}'
+
+    def get(self, key):
+        value = LocalCache.get(self._local_key(key))
+        if value is None:
+            value = cache.get(self._key(key), version=self.version)
+            if value is not None:
+                LocalCache.set(self._local_key(key), value, self._local_ttl_for(self.ttl))
+        return value
+
+    def get_many(self, keys):
+        """
+        Returns a dict with the values found for the keys, the ones missing in the local tier
+        are requested to the shared cache all at once.
+        """
+        values, missing = {}, []
+        for key in keys:
+            value = LocalCache.get(self._local_key(key))
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = value
+        if missing:
+            found = cache.get_many([self._key(key) for key in missing], version=self.version)
+            local_ttl = self._local_ttl_for(self.ttl)
+            for key in missing:
+                value = found.get(self._key(key))
+                if value is not None:
+                    values[key] = value
+                    LocalCache.set(self._local_key(key), value, local_ttl)
+        return values
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        cache.set(self._key(key), value, ttl, version=self.version)
+        LocalCache.set(self._local_key(key), value, self._local_ttl_for(ttl))
+
+    def add(self, key, value, ttl=None):
+        """
+        Sets the value only if the key does not exist, in the shared cache only so it can be used
+        as a lock between workers. Returns whether it was set.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        return cache.add(self._key(key), value, ttl, version=self.version)
+
+    def delete(self, key):
+        LocalCache.delete(self._local_key(key))
+        cache.delete(self._key(key), version=self.version)
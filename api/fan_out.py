@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .process_local import ProcessLocal
+
+
+class FanOut(object):
+    """
+    Per worker bounded thread pool to resolve independent lazy praw objects (authors, submissions,
+    subreddits...) concurrently, so the latency is the one of the slowest instead of the sum.
+    When all the FAN_OUT_POOL_SIZE threads are busy the calls just run in the caller thread, a
+    saturated pool never queues requests. Keeps some metrics per worker, exposed in /metrics.
+    """
+
+    _executor = ProcessLocal()
+    _active = 0
+    _lock = threading.Lock()
+    _metrics = {'calls': 0, 'pooled': 0, 'saturated': 0, 'max_active': 0}
+
+    @classmethod
+    def run(cls, *calls):
+        """
+        Calls the callables concurrently and returns their results in the same order. The first
+        one runs in the caller thread. Raises the exception of any call that failed.
+        """
+        futures = [None] + [cls._submit(call) for call in calls[1:]]
+        # The first one and the ones that didn't fit in the pool run here meanwhile
+        results = [call() if future is None else None for call, future in zip(calls, futures)]
+        for index, future in enumerate(futures):
+            if future is not None:
+                results[index] = future.result()
+        return results
+
+    @classmethod
+    def get_metrics(cls):
+        with cls._lock:
+            return dict(
+                cls._metrics, active=cls._active, pool_size=settings.FAN_OUT_POOL_SIZE
+            )
+
+    @classmethod
+    def _submit(cls, call):
+        # Returns the future of the call, or None if the pool is saturated
+        with cls._lock:
+            executor = cls._executor.get(cls._make_executor)
+            cls._metrics['calls'] += 1
+            if cls._active >= settings.FAN_OUT_POOL_SIZE:
+                cls._metrics['saturated'] += 1
+                return None
+            cls._active += 1
+            cls._metrics['pooled'] += 1
+            cls._metrics['max_active'] = max(cls._metrics['max_active'], cls._active)
+        return executor.submit(cls._run_pooled, call)
+
+    @classmethod
+    def _run_pooled(cls, call):
+        try:
+            return call()
+        finally:
+            with cls._lock:
+                cls._active -= 1
+
+    @classmethod
+    def _make_executor(cls):
+        # The lock must be held. A new pool is made after a fork, the parent threads are gone
+        cls._active = 0
+        return ThreadPoolExecutor(
+            max_workers=settings.FAN_OUT_POOL_SIZE, thread_name_prefix='fan-out'
+        )
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import requests
+from django.conf import settings
+from prawcore import Requestor
+from prawcore.exceptions import RequestException
+
+from .process_local import ProcessLocal
+
+
+class HttpPool(object):
+    """
+    Per worker requests sessions, one for each upstream service, so the connections (and their
+    TLS handshakes) are kept alive and reused by every request of the worker.
+    Sessions are created lazily and recreated after a fork, sockets can't be shared by processes.
+    """
+
+    _sessions = ProcessLocal()
+
+    @classmethod
+    def get_session(cls, name, pool_size, max_retries=0):
+        return cls._sessions.get(lambda: cls._make_session(pool_size, max_retries), key=name)
+
+    @staticmethod
+    def _make_session(pool_size, max_retries):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=max_retries
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+class PooledRequestor(Requestor):
+    """
+    prawcore Requestor that uses the worker shared Reddit session and the configured
+    connect/read timeouts instead of the prawcore fixed one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault(
+            'session', HttpPool.get_session('reddit', settings.REDDIT_HTTP_POOL_SIZE)
+        )
+        super().__init__(*args, **kwargs)
+
+    def request(self, *args, **kwargs):
+        try:
+            return self._http.request(
+                *args,
+                timeout=(
+                    settings.REDDIT_HTTP_CONNECT_TIMEOUT,
+                    settings.REDDIT_HTTP_READ_TIMEOUT,
+                ),
+                **kwargs,
+            )
+        except Exception as exc:
+            raise RequestException(exc, args, kwargs)
+
+    def close(self):
+        # The session is shared by all the instances of the worker, never close it here
+        pass
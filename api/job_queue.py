@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+import json
+import os
+import time
+import uuid
+from importlib import import_module
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+
+from .process_local import ProcessLocal
+from .utils import Utils
+
+logger = Utils.init_logger(__name__)
+
+
+class JobQueue(object):
+    """
+    Background jobs queue in Redis, for the work the responses do not need to wait for (like the
+    models upserts). Run the workers with `python manage.py run_jobs`.
+
+    A job is the dotted path of a handler and a JSON payload. Handlers are called with a list of
+    payloads, the worker takes up to JOB_QUEUE_BATCH_SIZE jobs at once and groups them by
+    handler. When a batch fails its jobs are run one by one, and the ones failing again are
+    retried later with exponential backoff (JOB_QUEUE_RETRY_DELAY seconds the first time).
+    After JOB_QUEUE_MAX_ATTEMPTS attempts a job is moved to the dead letters list with its error,
+    the last JOB_QUEUE_DEAD_MAX are kept there to be inspected or requeued.
+    Handlers must be idempotent, a worker killed in the middle of a batch loses it.
+    """
+
+    QUEUE_KEY = 'jobs:queue'
+    DELAYED_KEY = 'jobs:delayed'
+    DEAD_KEY = 'jobs:dead'
+
+    _client = ProcessLocal()
+
+    @classmethod
+    def get_client(cls):
+        # Connections can't be shared with the forked workers
+        return cls._client.get(cls._make_client)
+
+    @staticmethod
+    def _make_client():
+        try:
+            return redis.Redis.from_url(
+                settings.JOB_QUEUE_REDIS_URL,
+                socket_connect_timeout=settings.JOB_QUEUE_SOCKET_TIMEOUT,
+                socket_timeout=settings.JOB_QUEUE_POLL_TIMEOUT
+                + settings.JOB_QUEUE_SOCKET_TIMEOUT,
+            )
+        except ValueError as ex:
+            # A missing or invalid URL is the same as a Redis not available, the jobs run inline
+            raise redis.ConnectionError(
+                f'Invalid JOB_QUEUE_REDIS_URL (or REDIS_URL): {ex}'
+            ) from ex
+
+    @staticmethod
+    def resolve(handler):
+        """
+        Returns the callable of the handler dotted path, a module function or a class method
+        (like 'subreddits.utils.SubredditsUtils.save_subreddits').
+        """
+        parts = handler.split('.')
+        for index in range(len(parts) - 1, 0, -1):
+            try:
+                obj = import_module('.'.join(parts[:index]))
+            except ImportError:
+                continue
+            for attr in parts[index:]:
+                obj = getattr(obj, attr)
+            return obj
+        raise ImportError(f'Job handler {handler} not found.')
+
+    @staticmethod
+    def _dumps(job):
+        return json.dumps(job, cls=DjangoJSONEncoder)
+
+    @staticmethod
+    def enqueue(handler, payload):
+        """
+        Enqueues a job for the handler (dotted path of a callable receiving a list of payloads)
+        and returns its id. If Redis is not available (or its URL is not configured) the handler
+        runs inline instead, the work is not lost.
+        """
+        job = {
+            'id': uuid.uuid4().hex,
+            'handler': handler,
+            'payload': payload,
+            'attempts': 0,
+            'enqueued_at': time.time(),
+        }
+        try:
+            JobQueue.get_client().lpush(JobQueue.QUEUE_KEY, JobQueue._dumps(job))
+        except redis.RedisError as ex:
+            logger.warning(
+                f'Could not enqueue job {handler}, running it inline. '
+                f'Exception raised: {repr(ex)}.'
+            )
+            # Same payload the worker would get
+            JobQueue.resolve(handler)([json.loads(JobQueue._dumps(payload))])
+        return job['id']
+
+    @staticmethod
+    def work(burst=False, should_stop=lambda: False):
+        """
+        Worker loop, processes the jobs until should_stop() returns True. With burst it returns
+        as soon as there are no jobs ready.
+        """
+        logger.info(f'Jobs worker {os.getpid()} started.')
+        while not should_stop():
+            JobQueue._promote_delayed()
+            jobs = JobQueue._pop_batch(block=not burst)
+            if jobs:
+                JobQueue._process(jobs)
+            elif burst:
+                break
+        logger.info(f'Jobs worker {os.getpid()} stopped.')
+
+    @staticmethod
+    def _pop_batch(block):
+        client = JobQueue.get_client()
+        if block:
+            # Wait for the first one, then take the rest of the batch if there are more
+            item = client.brpop(JobQueue.QUEUE_KEY, settings.JOB_QUEUE_POLL_TIMEOUT)
+            if item is None:
+                return []
+            items, size = [item[1]], settings.JOB_QUEUE_BATCH_SIZE - 1
+        else:
+            items, size = [], settings.JOB_QUEUE_BATCH_SIZE
+        if size > 0:
+            # The oldest jobs are at the right end of the list
+            pipe = client.pipeline()
+            pipe.lrange(JobQueue.QUEUE_KEY, -size, -1)
+            pipe.ltrim(JobQueue.QUEUE_KEY, 0, -size - 1)
+            items += reversed(pipe.execute()[0])
+        return [json.loads(item) for item in items]
+
+    @staticmethod
+    def _process(jobs):
+        # The worker is long lived, don't keep using a connection the database closed
+        close_old_connections()
+        groups = {}
+        for job in jobs:
+            groups.setdefault(job['handler'], []).append(job)
+
+        for handler, group in groups.items():
+            try:
+                JobQueue._run(handler, group)
+            except Exception as ex:
+                if len(group) == 1:
+                    JobQueue._fail(group[0], ex)
+                    continue
+                # Find which ones are failing
+                for job in group:
+                    try:
+                        JobQueue._run(handler, [job])
+                    except Exception as ex:
+                        JobQueue._fail(job, ex)
+
+    @staticmethod
+    def _run(handler, jobs):
+        start = time.monotonic()
+        JobQueue.resolve(handler)([job['payload'] for job in jobs])
+        logger.debug(f'{len(jobs)} {handler} jobs done in {time.monotonic() - start:.3f}s')
+
+    @staticmethod
+    def _fail(job, ex):
+        error = repr(ex)
+        job['attempts'] += 1
+        job['error'] = error
+        client = JobQueue.get_client()
+        if job['attempts'] >= settings.JOB_QUEUE_MAX_ATTEMPTS:
+            logger.error(
+                f'Job {job["id"]} {job["handler"]} failed {job["attempts"]} times, '
+                f'moved to dead letters. {error}'
+            )
+            job['failed_at'] = time.time()
+            pipe = client.pipeline()
+            pipe.lpush(JobQueue.DEAD_KEY, JobQueue._dumps(job))
+            pipe.ltrim(JobQueue.DEAD_KEY, 0, settings.JOB_QUEUE_DEAD_MAX - 1)
+            pipe.execute()
+            return
+
+        delay = settings.JOB_QUEUE_RETRY_DELAY * 2 ** (job['attempts'] - 1)
+        logger.warning(
+            f'Job {job["id"]} {job["handler"]} failed, retrying in {delay}s. {error}'
+        )
+        client.zadd(JobQueue.DELAYED_KEY, {JobQueue._dumps(job): time.time() + delay})
+
+    @staticmethod
+    def _promote_delayed():
+        client = JobQueue.get_client()
+        items = client.zrangebyscore(JobQueue.DELAYED_KEY, 0, time.time(), start=0, num=100)
+        for item in items:
+            # Only the worker that removes it requeues it
+            if client.zrem(JobQueue.DELAYED_KEY, item):
+                client.lpush(JobQueue.QUEUE_KEY, item)
+
+    @staticmethod
+    def requeue_dead():
+        """
+        Moves the dead letters back to the queue with their attempts reset, returns how many.
+        """
+        client = JobQueue.get_client()
+        count = 0
+        while (item := client.rpop(JobQueue.DEAD_KEY)) is not None:
+            job = json.loads(item)
+            job.update(attempts=0, error=None, failed_at=None)
+            client.lpush(JobQueue.QUEUE_KEY, JobQueue._dumps(job))
+            count += 1
+        return count
+
+    @staticmethod
+    def get_metrics():
+        client = JobQueue.get_client()
+        pipe = client.pipeline()
+        pipe.llen(JobQueue.QUEUE_KEY)
+        pipe.zcard(JobQueue.DELAYED_KEY)
+        pipe.llen(JobQueue.DEAD_KEY)
+        queued, delayed, dead = pipe.execute()
+        return {'queued': queued, 'delayed': delayed, 'dead': dead}
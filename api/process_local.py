@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+import os
+import threading
+
+
+class ProcessLocal(object):
+    """
+    Values created lazily once per worker process, like thread pools and connection pools.
+    Threads and sockets don't survive a fork, so the values are created again in the forked
+    processes instead of using the ones inherited from the parent.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self, factory, key=None):
+        """
+        Returns the value of the key for this process, calling factory() to create it the first
+        time. The factory runs with the lock held, so it's called only once per process and key.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._values = {}
+                self._pid = os.getpid()
+            if key not in self._values:
+                self._values[key] = factory()
+            return self._values[key]
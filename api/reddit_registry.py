@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class RedditRegistry(object):
+    """
+    Process wide registry of praw.Reddit instances.
+    Instances are keyed by the ClientOrg id and a hash of its refresh token, so every request
+    of the same client reuses the same requestor, http session and authorizer (with its access
+    token) instead of building a new praw.Reddit each time. The read only instance is shared by
+    all the requests without a client org.
+    Entries are evicted in LRU order when the registry is full, and also when they have been
+    idle for more than REDDIT_INSTANCES_IDLE_TIMEOUT seconds.
+    """
+
+    READ_ONLY_KEY = ('read_only', None)
+
+    _instances = OrderedDict()
+    _lock = threading.RLock()
+
+    @staticmethod
+    def token_hash(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def identity(reddit):
+        """
+        Who the reddit instance requests as: 'read_only' or the hash of its refresh token.
+        """
+        if reddit.read_only:
+            return 'read_only'
+        return RedditRegistry.token_hash(reddit._core._authorizer.refresh_token)
+
+    @staticmethod
+    def make_key(client_org=None):
+        if client_org is None or not client_org.reddit_token:
+            return RedditRegistry.READ_ONLY_KEY
+        return (client_org.id, RedditRegistry.token_hash(client_org.reddit_token))
+
+    @classmethod
+    def get(cls, key, factory):
+        """
+        Returns the instance registered with the key, creating it with the factory callable
+        if there is none yet (or the previous one expired).
+        """
+        with cls._lock:
+            cls._evict_idle()
+            entry = cls._instances.get(key)
+            if entry is not None:
+                cls._instances.move_to_end(key)
+                entry['last_used'] = time.monotonic()
+                return entry['reddit']
+
+        # Build the instance outside the lock, praw parses the config here
+        reddit = factory()
+        with cls._lock:
+            entry = cls._instances.get(key)
+            if entry is None:
+                entry = {'reddit': reddit, 'last_used': time.monotonic()}
+                cls._instances[key] = entry
+                cls._evict_lru()
+            else:
+                # Another thread registered the same key meanwhile, keep that one
+                cls._instances.move_to_end(key)
+                entry['last_used'] = time.monotonic()
+            return entry['reddit']
+
+    @classmethod
+    def invalidate(cls, client_org_id):
+        """
+        Drops every instance registered for the client org id provided.
+        Needs to be called when the refresh token of the client org is revoked or rotated.
+        """
+        with cls._lock:
+            for key in [k for k in cls._instances if k[0] == client_org_id]:
+                del cls._instances[key]
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._instances.clear()
+
+    @classmethod
+    def _evict_idle(cls):
+        # The dict is kept in LRU order, so the idle entries are always at the start
+        deadline = time.monotonic() - settings.REDDIT_INSTANCES_IDLE_TIMEOUT
+        while cls._instances:
+            key, entry = next(iter(cls._instances.items()))
+            if entry['last_used'] >= deadline:
+                break
+            del cls._instances[key]
+
+    @classmethod
+    def _evict_lru(cls):
+        while len(cls._instances) > settings.REDDIT_INSTANCES_MAX_SIZE:
+            cls._instances.popitem(last=False)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from encrypted_model_fields.fields import encrypt_str, decrypt_str
+from prawcore.const import ACCESS_TOKEN_PATH
+from prawcore.exceptions import InvalidToken, OAuthException, ResponseException
+
+
+class RedditTokenState(object):
+    """
+    Validity state of the ClientOrgs reddit refresh tokens, shared by all the workers in cache.
+    A token is only checked against Reddit when its state is unknown, and the result is kept for
+    REDDIT_TOKEN_STATE_TTL seconds. The token refreshes praw makes during the actual requests
+    are watched too, so a revoked token is detected lazily by the first call that fails.
+    """
+
+    @staticmethod
+    def _cache_key(client_org_id):
+        return f'reddit_token_state_{client_org_id}'
+
+    @staticmethod
+    def get(client_org_id, token_hash):
+        """
+        Returns a (valid, error) tuple if the state of the token is known, None otherwise.
+        """
+        state = cache.get(RedditTokenState._cache_key(client_org_id))
+        if state and state['token_hash'] == token_hash:
+            return state['valid'], state['error']
+        return None
+
+    @staticmethod
+    def set(client_org_id, token_hash, valid, error=None):
+        cache.set(
+            RedditTokenState._cache_key(client_org_id),
+            {'token_hash': token_hash, 'valid': valid, 'error': error},
+            settings.REDDIT_TOKEN_STATE_TTL,
+        )
+
+    @staticmethod
+    def is_token_error(ex):
+        """
+        Whether the exception raised by praw means the refresh token is not valid anymore.
+        Server errors from the access token endpoint are not considered token errors.
+        """
+        if isinstance(ex, (OAuthException, InvalidToken)):
+            return True
+        if isinstance(ex, ResponseException):
+            response = ex.response
+            return response.status_code in (400, 401, 403) and response.url.endswith(
+                ACCESS_TOKEN_PATH
+            )
+        return False
+
+    @staticmethod
+    def watch_refresh(reddit, client_org_id, token_hash):
+        """
+        Wraps the refresh method of the authorized reddit instance authorizer to keep the
+        token state updated with the result of every refresh.
+        """
+        authorizer = reddit._core._authorizer
+        refresh = authorizer.refresh
+
+        def watched_refresh():
+            try:
+                refresh()
+            except (ResponseException, OAuthException) as ex:
+                if RedditTokenState.is_token_error(ex):
+                    RedditTokenState.set(client_org_id, token_hash, False, repr(ex))
+                raise
+            RedditTokenState.set(client_org_id, token_hash, True)
+
+        authorizer.refresh = watched_refresh
+
+    @staticmethod
+    def check(reddit, client_org_id, token_hash):
+        """
+        Returns a (valid, error) tuple for the token of the reddit instance provided.
+        When the state is unknown the instance authorizer gets an access token if it does not
+        have a usable one yet, which is the same token request the first real call would make.
+        """
+        state = RedditTokenState.get(client_org_id, token_hash)
+        if state is not None:
+            return state
+
+        authorizer = reddit._core._authorizer
+        if authorizer.is_valid():
+            RedditTokenState.set(client_org_id, token_hash, True)
+        else:
+            try:
+                authorizer.refresh()
+            except (ResponseException, OAuthException) as ex:
+                return False, repr(ex)
+        return True, None
+
+
+class RedditTokenCache(object):
+    """
+    Reddit access tokens shared by all the workers (and hosts) through the cache.
+    The refresh method of an instance authorizer is wrapped so it takes the token from cache
+    when there is a usable one, and only the worker holding the refresh lock in cache asks
+    Reddit for a new one. Tokens are renewed REDDIT_TOKEN_REFRESH_MARGIN seconds before they
+    expire and the other workers keep using the old one meanwhile.
+    Access tokens are kept encrypted with the FIELD_ENCRYPTION_KEY.
+    """
+
+    APP_TOKEN_KEY = 'reddit_app_token'
+
+    @staticmethod
+    def client_key(client_org_id):
+        return f'reddit_access_token_{client_org_id}'
+
+    @staticmethod
+    def delete(client_org_id):
+        """
+        Removes the client org access token, call it when its refresh token changes or is revoked.
+        """
+        cache.delete(RedditTokenCache.client_key(client_org_id))
+
+    @staticmethod
+    def share(authorizer, key, token_hash=None):
+        """
+        Makes the authorizer get its access tokens from the cache key provided. The token_hash
+        identifies the refresh token the access tokens belong to, if any.
+        """
+        refresh = authorizer.refresh
+        # Last token given to this authorizer, to recognize it if Reddit rejects it
+        applied = {'access_token': None, 'expires_at': 0}
+
+        def apply(token, margin):
+            # The authorizer asks again margin seconds before the token really expires
+            authorizer.access_token = decrypt_str(token['access_token'])
+            authorizer.scopes = set(token['scopes'])
+            authorizer._expiration_timestamp = token['expires_at'] - margin
+            applied.update(
+                access_token=token['access_token'],
+                expires_at=authorizer._expiration_timestamp,
+            )
+
+        def is_usable(token, margin, rejected):
+            return (
+                token is not None
+                and token['token_hash'] == token_hash
+                and token['access_token'] != rejected
+                and token['expires_at'] - margin > time.time()
+            )
+
+        def shared_refresh():
+            # prawcore only refreshes before the token expires when Reddit rejected it (401)
+            rejected = (
+                applied['access_token'] if applied['expires_at'] > time.time() else None
+            )
+            margin = settings.REDDIT_TOKEN_REFRESH_MARGIN
+            token = cache.get(key)
+            if is_usable(token, margin, rejected):
+                apply(token, margin)
+                return
+
+            lock_key = f'{key}_lock'
+            if cache.add(lock_key, True, settings.REDDIT_TOKEN_LOCK_TIMEOUT):
+                try:
+                    refresh()
+                    token = {
+                        'token_hash': token_hash,
+                        'access_token': encrypt_str(authorizer.access_token).decode('utf-8'),
+                        'scopes': list(authorizer.scopes),
+                        'expires_at': authorizer._expiration_timestamp,
+                    }
+                    cache.set(key, token, int(token['expires_at'] - time.time()))
+                    apply(token, margin)
+                finally:
+                    cache.delete(lock_key)
+                return
+
+            # Another worker is renewing it, the old token is fine if it did not expire yet
+            if is_usable(token, 0, rejected):
+                apply(token, 0)
+                return
+            deadline = time.monotonic() + settings.REDDIT_TOKEN_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                token = cache.get(key)
+                if is_usable(token, 0, rejected):
+                    apply(token, 0)
+                    return
+            # Took too long, just get a token for this instance
+            refresh()
+
+        authorizer.refresh = shared_refresh
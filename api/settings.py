@@ -55,6 +55,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # ETags (md5 of the rendered content) and 304 responses for the GET requests
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -175,3 +177,114 @@ REST_FRAMEWORK = {
 
 # To be able to use encrypted model fields
 FIELD_ENCRYPTION_KEY = os.environ.get('FIELD_ENCRYPTION_KEY', '')
+
+# Max number of praw.Reddit instances kept per worker and seconds an instance can stay idle
+# before being dropped from the registry
+REDDIT_INSTANCES_MAX_SIZE = int(os.environ.get('REDDIT_INSTANCES_MAX_SIZE', 256))
+REDDIT_INSTANCES_IDLE_TIMEOUT = int(os.environ.get('REDDIT_INSTANCES_IDLE_TIMEOUT', 900))
+
+# Seconds the validity state of a client reddit refresh token is kept in cache
+REDDIT_TOKEN_STATE_TTL = int(os.environ.get('REDDIT_TOKEN_STATE_TTL', 300))
+
+# Seconds between the bulk writes of the buffered ClientOrg.last_client_request_at values
+CLIENT_REQUESTS_FLUSH_INTERVAL = int(os.environ.get('CLIENT_REQUESTS_FLUSH_INTERVAL', 30))
+
+# Bearer token authentication cache, seconds in the shared cache and in the per worker tier
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 300))
+TOKEN_AUTH_LOCAL_TTL = int(os.environ.get('TOKEN_AUTH_LOCAL_TTL', 10))
+
+# Keep-alive connection pool shared by all the Reddit instances of a worker, and the timeouts
+# (seconds) for connecting and reading every Reddit request
+REDDIT_HTTP_POOL_SIZE = int(os.environ.get('REDDIT_HTTP_POOL_SIZE', 10))
+REDDIT_HTTP_CONNECT_TIMEOUT = float(os.environ.get('REDDIT_HTTP_CONNECT_TIMEOUT', 3.05))
+REDDIT_HTTP_READ_TIMEOUT = float(os.environ.get('REDDIT_HTTP_READ_TIMEOUT', 16))
+
+# HTTP client for the Salesforce OAuth endpoints: pool size, timeouts (seconds) and the retries
+# with exponential backoff of the 5xx responses
+SALESFORCE_HTTP_POOL_SIZE = int(os.environ.get('SALESFORCE_HTTP_POOL_SIZE', 4))
+SALESFORCE_HTTP_CONNECT_TIMEOUT = float(
+    os.environ.get('SALESFORCE_HTTP_CONNECT_TIMEOUT', 3.05)
+)
+SALESFORCE_HTTP_READ_TIMEOUT = float(os.environ.get('SALESFORCE_HTTP_READ_TIMEOUT', 10))
+SALESFORCE_HTTP_MAX_RETRIES = int(os.environ.get('SALESFORCE_HTTP_MAX_RETRIES', 2))
+SALESFORCE_HTTP_BACKOFF_FACTOR = float(
+    os.environ.get('SALESFORCE_HTTP_BACKOFF_FACTOR', 0.5)
+)
+
+# Reddit access tokens shared by the workers in cache: seconds before the expiry they are
+# renewed, and the maximum seconds a worker holds (or waits for) the renewal lock
+REDDIT_TOKEN_REFRESH_MARGIN = int(os.environ.get('REDDIT_TOKEN_REFRESH_MARGIN', 300))
+REDDIT_TOKEN_LOCK_TIMEOUT = int(os.environ.get('REDDIT_TOKEN_LOCK_TIMEOUT', 20))
+
+# Seconds the subreddit name resolutions are kept in cache, the unknown or private names
+# (negative resolutions) for less time
+SUBREDDIT_RESOLUTION_TTL = int(os.environ.get('SUBREDDIT_RESOLUTION_TTL', 3600))
+SUBREDDIT_NEGATIVE_TTL = int(os.environ.get('SUBREDDIT_NEGATIVE_TTL', 300))
+
+# Subreddit details cache: seconds the data is fresh, seconds it can still be served stale while
+# refreshed in background, and maximum seconds a background refresh can take
+SUBREDDIT_DETAILS_FRESH_TTL = int(os.environ.get('SUBREDDIT_DETAILS_FRESH_TTL', 300))
+SUBREDDIT_DETAILS_STALE_TTL = int(os.environ.get('SUBREDDIT_DETAILS_STALE_TTL', 86400))
+SUBREDDIT_DETAILS_REVALIDATE_TIMEOUT = int(
+    os.environ.get('SUBREDDIT_DETAILS_REVALIDATE_TIMEOUT', 60)
+)
+
+# Subreddit submissions listing windows: seconds they are shared in cache and minimum number of
+# submissions asked to Reddit when extending one
+SUBMISSIONS_WINDOW_TTL = int(os.environ.get('SUBMISSIONS_WINDOW_TTL', 60))
+SUBMISSIONS_WINDOW_BATCH = int(os.environ.get('SUBMISSIONS_WINDOW_BATCH', 25))
+
+# Comment tree snapshots: seconds they are kept in cache and maximum comments asked to Reddit
+COMMENTS_SNAPSHOT_TTL = int(os.environ.get('COMMENTS_SNAPSHOT_TTL', 60))
+COMMENTS_SNAPSHOT_LIMIT = int(os.environ.get('COMMENTS_SNAPSHOT_LIMIT', 500))
+
+# Seconds the redditor profiles (authors data) are kept in cache, the deleted or suspended
+# accounts for less time
+REDDITOR_PROFILE_TTL = int(os.environ.get('REDDITOR_PROFILE_TTL', 3600))
+REDDITOR_PROFILE_NEGATIVE_TTL = int(os.environ.get('REDDITOR_PROFILE_NEGATIVE_TTL', 300))
+
+# Seconds the subreddit rules are kept in cache, they can be purged with DELETE on its endpoint
+SUBREDDIT_RULES_TTL = int(os.environ.get('SUBREDDIT_RULES_TTL', 86400))
+
+# Seconds the subscriptions list of each client is kept in cache
+SUBSCRIPTIONS_TTL = int(os.environ.get('SUBSCRIPTIONS_TTL', 3600))
+
+# Per worker tier of the api.caching namespaces: maximum total bytes, maximum bytes of a single
+# value and default seconds a value is kept
+CACHE_LOCAL_MAX_BYTES = int(os.environ.get('CACHE_LOCAL_MAX_BYTES', 32 * 1024 * 1024))
+CACHE_LOCAL_MAX_ITEM_BYTES = int(os.environ.get('CACHE_LOCAL_MAX_ITEM_BYTES', 1024 * 1024))
+CACHE_LOCAL_TTL = int(os.environ.get('CACHE_LOCAL_TTL', 30))
+
+# Single flight of the Reddit fetches between workers: maximum seconds the first worker holds
+# the lock (and the others wait for it), and seconds its result is kept for them
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_LOCK_TIMEOUT', 10))
+SINGLE_FLIGHT_RESULT_TTL = int(os.environ.get('SINGLE_FLIGHT_RESULT_TTL', 5))
+
+# Threads of the per worker pool used to fetch independent Reddit objects concurrently
+FAN_OUT_POOL_SIZE = int(os.environ.get('FAN_OUT_POOL_SIZE', 8))
+
+# Background jobs queue (api.job_queue), run by `python manage.py run_jobs`: Redis to use, jobs
+# taken at once, attempts before a job goes to the dead letters, seconds before the first retry
+# (doubled every attempt), dead letters kept, and seconds of the blocking pops and socket timeouts
+JOB_QUEUE_REDIS_URL = os.environ.get('JOB_QUEUE_REDIS_URL', os.environ.get('REDIS_URL'))
+JOB_QUEUE_BATCH_SIZE = int(os.environ.get('JOB_QUEUE_BATCH_SIZE', 50))
+JOB_QUEUE_MAX_ATTEMPTS = int(os.environ.get('JOB_QUEUE_MAX_ATTEMPTS', 5))
+JOB_QUEUE_RETRY_DELAY = int(os.environ.get('JOB_QUEUE_RETRY_DELAY', 10))
+JOB_QUEUE_DEAD_MAX = int(os.environ.get('JOB_QUEUE_DEAD_MAX', 1000))
+JOB_QUEUE_POLL_TIMEOUT = int(os.environ.get('JOB_QUEUE_POLL_TIMEOUT', 5))
+JOB_QUEUE_SOCKET_TIMEOUT = int(os.environ.get('JOB_QUEUE_SOCKET_TIMEOUT', 5))
+
+# Image and video submission jobs: seconds their status is kept, and seconds the jobs worker
+# waits for Reddit to tell the new submission once the media is uploaded
+SUBMISSION_JOB_TTL = int(os.environ.get('SUBMISSION_JOB_TTL', 86400))
+SUBMISSION_MEDIA_TIMEOUT = int(os.environ.get('SUBMISSION_MEDIA_TIMEOUT', 60))
+
+# Batch endpoint: maximum sub-requests in a batch, sub-requests of a batch run at once, threads
+# of the per worker pool shared by the batches and seconds a batch can take
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 50))
+BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', 8))
+BATCH_POOL_SIZE = int(os.environ.get('BATCH_POOL_SIZE', 16))
+BATCH_TIMEOUT = int(os.environ.get('BATCH_TIMEOUT', 25))
+
+# Maximum seconds the lock of a client cached subscriptions list is held (or waited for)
+SUBSCRIPTIONS_LOCK_TIMEOUT = int(os.environ.get('SUBSCRIPTIONS_LOCK_TIMEOUT', 5))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from praw.const import API_PATH
+
+from .caching import CacheNamespace
+from .reddit_registry import RedditRegistry
+
+
+class SingleFlight(object):
+    """
+    Coalescing of identical concurrent Reddit fetches.
+    In a worker the callers of the same fetch share the future of the first one. Between workers
+    the first one takes a short lock in cache and leaves the result there for
+    SINGLE_FLIGHT_RESULT_TTL seconds, the others wait for it instead of asking Reddit too.
+    Fetches are keyed by the reddit identity as well, the users don't see the same data.
+    """
+
+    _calls = {}
+    _lock = threading.Lock()
+    _results = CacheNamespace('single_flight', 'SINGLE_FLIGHT_RESULT_TTL', local_ttl=0)
+
+    @staticmethod
+    def fetch(obj):
+        """
+        Same as obj._fetch() for the lazy praw object provided (Submission, Comment, Redditor,
+        Subreddit...), but the request for its data goes through the single flight.
+        """
+        reddit = obj._reddit
+
+        def fetch_data():
+            name, fields, params = obj._fetch_info()
+            path = API_PATH[name].format(**fields)
+            key = SingleFlight._make_key(reddit, path, params)
+            return SingleFlight.run(key, lambda: reddit.request('GET', path, params))
+
+        obj._fetch_data = fetch_data
+        try:
+            obj._fetch()
+        finally:
+            obj.__dict__.pop('_fetch_data', None)
+
+    @staticmethod
+    def _make_key(reddit, path, params):
+        identity = RedditRegistry.identity(reddit)
+        params = sorted((params or {}).items())
+        return hashlib.sha256(f'{identity}:{path}:{params}'.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def run(cls, key, fn):
+        """
+        Returns the result of fn, called only once for all the concurrent callers with the key.
+        """
+        with cls._lock:
+            future = cls._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                cls._calls[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            result = cls._run_shared(key, fn)
+        except Exception as ex:
+            future.set_exception(ex)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with cls._lock:
+                cls._calls.pop(key, None)
+
+    @classmethod
+    def _run_shared(cls, key, fn):
+        entry = cls._results.get(key)
+        if entry is not None:
+            return entry['result']
+
+        lock_key = f'{key}_lock'
+        if cls._results.add(lock_key, True, settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+            try:
+                result = fn()
+                cls._results.set(key, {'result': result})
+                return result
+            finally:
+                cls._results.delete(lock_key)
+
+        # Another worker is fetching it, wait for its result
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cls._results.get(key)
+            if entry is not None:
+                return entry['result']
+            if cls._results.get(lock_key) is None:
+                # Either it just finished or it failed and there is no result coming
+                entry = cls._results.get(key)
+                if entry is not None:
+                    return entry['result']
+                break
+        return fn()
@@ -0,0 +1,242 @@
+import threading
+from unittest import mock
+
+import redis
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from clients.utils import ClientsUtils
+from .caching import LocalCache
+from .job_queue import JobQueue
+from .process_local import ProcessLocal
+from .reddit_registry import RedditRegistry
+from .single_flight import SingleFlight
+
+# Payloads the test job handlers were called with
+handled_payloads = []
+
+
+def record_job(payloads):
+    # A batch with a bad payload fails as a whole
+    if 'bad' in payloads:
+        raise ValueError('Bad payload.')
+    handled_payloads.extend(payloads)
+
+
+class BatchTests(APITestCase):
+    def setUp(self):
+        # I need to insert a dummy client and add the token key in the client
+        # credentials for authorizing all requests by the test client
+        token_key = ClientsUtils.insert_dummy_client()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token_key}')
+
+    def test_batch(self):
+        """
+        Function to test batch endpoint when having the bearer token.
+        The responses must come in the same order as the requests.
+        """
+        url = reverse('batch')
+        response = self.client.post(url, data={'requests': []})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(
+            url,
+            data={
+                'requests': [
+                    {'method': 'GET', 'path': '/subreddits/test'},
+                    {'method': 'GET', 'path': '/submissions/78uvdw'},
+                    {'method': 'GET', 'path': '/submissions/1234567890'},
+                    {'method': 'POST', 'path': '/batch'},
+                ]
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        responses = response.data['responses']
+        self.assertEqual(
+            [item['status'] for item in responses],
+            [
+                status.HTTP_200_OK,
+                status.HTTP_200_OK,
+                status.HTTP_404_NOT_FOUND,
+                status.HTTP_404_NOT_FOUND,
+            ],
+        )
+        self.assertEqual(responses[0]['body']['data']['display_name'], 'test')
+        self.assertEqual(responses[1]['body']['data']['id'], '78uvdw')
+
+
+class MetricsTests(APITestCase):
+    def test_metrics(self):
+        """
+        Function to test metrics endpoint, only for the admin users.
+        """
+        url = reverse('metrics')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue('saturated' in response.data['fan_out'])
+        self.assertTrue('server_errors' in response.data['salesforce'])
+
+
+class LocalCacheTests(SimpleTestCase):
+    def setUp(self):
+        LocalCache.clear()
+
+    def tearDown(self):
+        LocalCache.clear()
+
+    @override_settings(CACHE_LOCAL_MAX_BYTES=1000, CACHE_LOCAL_MAX_ITEM_BYTES=400)
+    def test_byte_bounded_eviction(self):
+        """
+        Function to test the local cache is bounded by the bytes of its values, evicting the
+        least recently used ones, and the values too big are not kept.
+        """
+        for key in ('a', 'b', 'c'):
+            LocalCache.set(key, 'x' * 300, 60)
+        # Using a makes b the least recently used one
+        self.assertEqual(LocalCache.get('a'), 'x' * 300)
+        LocalCache.set('d', 'x' * 300, 60)
+        self.assertIsNone(LocalCache.get('b'))
+        for key in ('a', 'c', 'd'):
+            self.assertEqual(LocalCache.get(key), 'x' * 300)
+
+        LocalCache.set('e', 'x' * 500, 60)
+        self.assertIsNone(LocalCache.get('e'))
+        LocalCache.set('a', 'y', 0)
+        self.assertIsNone(LocalCache.get('a'))
+
+
+class ProcessLocalTests(SimpleTestCase):
+    def test_created_per_process(self):
+        """
+        Function to test the values are created once per key, and again after a fork.
+        """
+        values = ProcessLocal()
+        a = values.get(object)
+        self.assertIs(values.get(object), a)
+        self.assertIsNot(values.get(object, key='other'), a)
+        with mock.patch('api.process_local.os.getpid', return_value=-1):
+            self.assertIsNot(values.get(object), a)
+
+
+class RedditRegistryTests(SimpleTestCase):
+    def setUp(self):
+        RedditRegistry.clear()
+
+    def tearDown(self):
+        RedditRegistry.clear()
+
+    @override_settings(REDDIT_INSTANCES_MAX_SIZE=2, REDDIT_INSTANCES_IDLE_TIMEOUT=3600)
+    def test_lru_eviction(self):
+        """
+        Function to test the registry reuses its instances and evicts the least recently used
+        one when it's full.
+        """
+        a, b, c = object(), object(), object()
+        self.assertIs(RedditRegistry.get(('a', None), lambda: a), a)
+        self.assertIs(RedditRegistry.get(('b', None), lambda: b), b)
+        self.assertIs(RedditRegistry.get(('a', None), object), a)
+        RedditRegistry.get(('c', None), lambda: c)
+        self.assertIs(RedditRegistry.get(('a', None), object), a)
+        self.assertIs(RedditRegistry.get(('c', None), object), c)
+        self.assertIsNot(RedditRegistry.get(('b', None), object), b)
+
+    @override_settings(REDDIT_INSTANCES_MAX_SIZE=10, REDDIT_INSTANCES_IDLE_TIMEOUT=0)
+    def test_idle_eviction(self):
+        """
+        Function to test the instances idle for more than the timeout are built again.
+        """
+        a = object()
+        RedditRegistry.get(('a', None), lambda: a)
+        self.assertIsNot(RedditRegistry.get(('a', None), object), a)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+)
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        LocalCache.clear()
+
+    def test_run_coalesced(self):
+        """
+        Function to test the concurrent callers of the same key get the result of only one call.
+        """
+        calls = []
+        started, release = threading.Event(), threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'value': 1}
+
+        results = []
+
+        def call():
+            results.append(SingleFlight.run('coalesced', fetch))
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 1}] * 5)
+
+    def test_run_failed(self):
+        """
+        Function to test a failed call raises and its error is not kept for the next callers.
+        """
+
+        def fail():
+            raise ValueError('Failed fetch.')
+
+        with self.assertRaises(ValueError):
+            SingleFlight.run('failed', fail)
+        self.assertEqual(SingleFlight.run('failed', lambda: 2), 2)
+
+
+@override_settings(JOB_QUEUE_MAX_ATTEMPTS=2, JOB_QUEUE_RETRY_DELAY=0, JOB_QUEUE_BATCH_SIZE=10)
+class JobQueueTests(SimpleTestCase):
+    def setUp(self):
+        # The queue keys of the tests, not to touch the real jobs
+        for name in ('QUEUE_KEY', 'DELAYED_KEY', 'DEAD_KEY'):
+            patcher = mock.patch.object(JobQueue, name, f'test:{getattr(JobQueue, name)}')
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        try:
+            client = JobQueue.get_client()
+            client.delete(JobQueue.QUEUE_KEY, JobQueue.DELAYED_KEY, JobQueue.DEAD_KEY)
+        except (redis.RedisError, ValueError):
+            # ValueError when the Redis URL is missing or invalid
+            self.skipTest('The jobs queue Redis is not available.')
+        self.addCleanup(
+            client.delete, JobQueue.QUEUE_KEY, JobQueue.DELAYED_KEY, JobQueue.DEAD_KEY
+        )
+        handled_payloads.clear()
+
+    def test_retry_dead_letters(self):
+        """
+        Function to test the jobs of a failed batch are run one by one, and the ones failing
+        every attempt end in the dead letters, from where they can be requeued.
+        """
+        for payload in ('good', 'bad', 'other'):
+            JobQueue.enqueue('api.tests.record_job', payload)
+        JobQueue.work(burst=True)
+
+        self.assertEqual(sorted(handled_payloads), ['good', 'other'])
+        self.assertEqual(JobQueue.get_metrics(), {'queued': 0, 'delayed': 0, 'dead': 1})
+        self.assertEqual(JobQueue.requeue_dead(), 1)
+        self.assertEqual(JobQueue.get_metrics(), {'queued': 1, 'delayed': 0, 'dead': 0})
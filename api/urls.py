@@ -17,6 +17,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import redirect
 
+import api.views as views
+
 
 admin.autodiscover()
 
@@ -29,5 +31,7 @@ urlpatterns = [
     path('subreddits/', include('subreddits.urls', namespace='subreddits')),
     path('submissions/', include('submissions.urls', namespace='submissions')),
     path('comments/', include('comments.urls', namespace='comments')),
+    path('batch', views.Batch.as_view(), name='batch'),
+    path('metrics', views.Metrics.as_view(), name='metrics'),
     path('admin/', admin.site.urls),
 ]
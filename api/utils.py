@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
+import base64
+import hashlib
 import random
+import re
 import logging
 import colorlog
 import os
 import praw
+import threading
 import urllib
 from datetime import datetime
 
@@ -11,13 +15,24 @@ from rest_framework.views import exception_handler
 from rest_framework import exceptions
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
-from prawcore.exceptions import ResponseException
+from django.db import connection
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 
 from clients.models import ClientOrg
 from redditors.models import Redditor
+from .reddit_registry import RedditRegistry
+from .http_pool import PooledRequestor
+from .renderers import CustomJSONRenderer
+from .reddit_tokens import RedditTokenCache, RedditTokenState
 
 
 def custom_json_exception_handler(exc, context):
+    # A reddit token revoked after its state was cached is only detected by the failing
+    # request, so handle it the same way as a failed check in Utils.new_client_request
+    if RedditTokenState.is_token_error(exc):
+        exc = Utils.reddit_authentication_failed(repr(exc))
+
     # Call REST framework's default exception handler first,
     # to get the standard error response.
     response = exception_handler(exc, context)
@@ -61,12 +76,14 @@ class Utils(object):
 
     @staticmethod
     def get_reddit_instance(token=None):
+        # All the instances share the worker keep-alive connection pool
         if token:
             return praw.Reddit(
                 client_id=os.environ.get('REDDIT_CLIENT_ID'),
                 client_secret=os.environ.get('REDDIT_CLIENT_SECRET'),
                 user_agent=os.environ.get('REDDIT_USER_AGENT'),
                 refresh_token=token,
+                requestor_class=PooledRequestor,
             )
         else:
             return praw.Reddit(
@@ -74,8 +91,48 @@ class Utils(object):
                 client_secret=os.environ.get('REDDIT_CLIENT_SECRET'),
                 user_agent=os.environ.get('REDDIT_USER_AGENT'),
                 redirect_uri=f'{os.environ.get("DOMAIN_URL")}/clients/oauth_callback',
+                requestor_class=PooledRequestor,
             )
 
+    @staticmethod
+    def get_pooled_reddit_instance(client_org=None):
+        """
+        Returns the registry praw.Reddit instance for the client org, authorized with its
+        refresh token, or the shared read only instance if no client org is provided.
+        Never call reddit.auth.authorize() on these instances, use get_reddit_instance() for that.
+        """
+        key = RedditRegistry.make_key(client_org)
+        if key == RedditRegistry.READ_ONLY_KEY:
+
+            def read_only_factory():
+                reddit = Utils.get_reddit_instance()
+                # The application only token is the same for every worker
+                RedditTokenCache.share(
+                    reddit._read_only_core._authorizer, RedditTokenCache.APP_TOKEN_KEY
+                )
+                return reddit
+
+            return RedditRegistry.get(key, read_only_factory)
+
+        def factory():
+            reddit = Utils.get_reddit_instance(token=client_org.reddit_token)
+            # Access tokens from the refresh token are shared by the workers too
+            RedditTokenCache.share(
+                reddit._core._authorizer, RedditTokenCache.client_key(key[0]), key[1]
+            )
+            RedditTokenState.watch_refresh(reddit, *key)
+            return reddit
+
+        return RedditRegistry.get(key, factory)
+
+    @staticmethod
+    def reddit_authentication_failed(error):
+        return exceptions.AuthenticationFailed(
+            'Reddit access token authorization problem. '
+            'The user may need to re-authorize the app. '
+            f'Exception raised: {error}.'
+        )
+
     @staticmethod
     def new_client_request(auth_client):
         """
@@ -115,28 +172,29 @@ class Utils(object):
 
         if client_org:
             client_org.new_client_request()
-            reddit = Utils.get_reddit_instance(token=client_org.reddit_token)
-            # Here I need to check if the access token is actually alive
-            # I can do a request to get the authenticated user data in a try/except
-            try:
-                reddit.user.me()
-            except ResponseException as ex:
-                if session_auth:
-                    # In this case if the reddit token is not live then just use
-                    # read only instance
-                    return Utils.get_reddit_instance(), None
-                else:
-                    raise exceptions.AuthenticationFailed(
-                        'Reddit access token authorization problem. '
-                        'The user may need to re-authorize the app. '
-                        f'Exception raised: {repr(ex)}.'
-                    )
+            reddit = Utils.get_pooled_reddit_instance(client_org)
+            if not reddit.read_only:
+                # Here I need to check if the refresh token is actually alive, the state is
+                # cached so Reddit is only asked when it is unknown
+                valid, error = RedditTokenState.check(
+                    reddit, *RedditRegistry.make_key(client_org)
+                )
+                if not valid:
+                    # No point on keeping an instance with a dead token in the registry
+                    RedditRegistry.invalidate(client_org.id)
+                    RedditTokenCache.delete(client_org.id)
+                    if session_auth:
+                        # In this case if the reddit token is not live then just use
+                        # read only instance
+                        return Utils.get_pooled_reddit_instance(), None
+                    else:
+                        raise Utils.reddit_authentication_failed(error)
 
             # All cool, I can return the reddit instance and client_org tuple
             return reddit, client_org
         else:
             # Read only reddit instance when no client org found
-            return Utils.get_reddit_instance(), None
+            return Utils.get_pooled_reddit_instance(), None
 
     @staticmethod
     def save_valid_state_in_cache(key, org_id=None):
@@ -149,6 +207,67 @@ class Utils(object):
         cache.set(f'{key}_{state}', state_data, 900)
         return state
 
+    @staticmethod
+    def run_in_background(target, *args):
+        """
+        Runs the target in a daemon thread, for work the response does not need to wait for.
+        Errors are only logged, and the thread database connection is closed at the end.
+        """
+
+        def run():
+            try:
+                target(*args)
+            except Exception as ex:
+                logger.error(
+                    f'Error in background task {target.__name__}. Exception raised: {repr(ex)}.'
+                )
+            finally:
+                connection.close()
+
+        threading.Thread(target=run, name=target.__name__, daemon=True).start()
+
+    @staticmethod
+    def make_etag(data):
+        """
+        Strong ETag of the payload as CustomJSONRenderer renders it, the same ETag the
+        ConditionalGetMiddleware sets in the response.
+        """
+        return quote_etag(hashlib.md5(CustomJSONRenderer().render(data)).hexdigest())
+
+    @staticmethod
+    def not_modified(request, etag):
+        """
+        Returns a 304 response if the If-None-Match header of the request matches the etag,
+        None otherwise. Lets the views with a cached payload skip its serialization.
+        """
+        if request.accepted_renderer.format != 'json':
+            return None
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            response['ETag'] = etag
+        return response
+
+    @staticmethod
+    def encode_cursor(fullname):
+        """
+        Opaque pagination cursor for the Reddit fullname provided.
+        """
+        return base64.urlsafe_b64encode(fullname.encode('utf-8')).decode('utf-8').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor, kind):
+        """
+        Returns the Reddit fullname in the cursor, validating it is of the kind provided (t1, t3...).
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            fullname = base64.urlsafe_b64decode(padded.encode('utf-8')).decode('utf-8')
+        except (ValueError, UnicodeDecodeError):
+            fullname = ''
+        if not re.fullmatch(f'{kind}_[0-9a-z]+', fullname):
+            raise exceptions.ParseError(detail={'detail': f'Cursor {cursor} invalid.'})
+        return fullname
+
     @staticmethod
     def make_url_with_params(path_url, **kwargs):
         return f'{path_url}?{urllib.parse.urlencode(kwargs)}'
@@ -166,3 +285,6 @@ class Utils(object):
                 }
             )
         return body
+
+
+logger = Utils.init_logger(__name__)
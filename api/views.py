@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import os
+
+from django.conf import settings
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status, exceptions
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.authentication import SessionAuthentication
+
+from clients.salesforce_client import SalesforceClient
+from .batch import BatchRequests
+from .fan_out import FanOut
+from .token_authentication import MyTokenAuthentication
+from .utils import Utils
+
+logger = Utils.init_logger(__name__)
+
+
+class Batch(APIView):
+    """
+        API endpoint to run many API requests in one round trip.\n
+        POST runs the sub-requests concurrently with the same authentication and returns their responses in the same order.\n
+        JSON data params:\n
+                    requests=[list] -- The sub-requests, objects with method (default=GET), path (with the query params) and body (optional).
+        Each response has the status code and the body the endpoint would return.
+        Up to BATCH_MAX_REQUESTS sub-requests, the ones not done in BATCH_TIMEOUT seconds get a 504.
+    """
+
+    authentication_classes = [MyTokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, Format=None):
+        logger.info('-' * 100)
+        logger.info('Batch request =>')
+
+        items = request.data.get('requests')
+        if not isinstance(items, list) or not items:
+            raise exceptions.ParseError(
+                detail={'detail': 'A non empty requests list must be provided in the json data.'}
+            )
+        if len(items) > settings.BATCH_MAX_REQUESTS:
+            raise exceptions.ParseError(
+                detail={
+                    'detail': f'A batch can have up to {settings.BATCH_MAX_REQUESTS} requests.'
+                }
+            )
+        if not all(isinstance(item, dict) for item in items):
+            raise exceptions.ParseError(
+                detail={'detail': 'Each request must be an object with a method and a path.'}
+            )
+
+        responses = BatchRequests.run(request, items)
+        logger.info(f'Batch of {len(items)} requests done.')
+        return Response({'responses': responses}, status=status.HTTP_200_OK)
+
+
+class Metrics(APIView):
+    """
+    API endpoint with the metrics of the worker process that serves the request, only for the
+    admin users (session auth). Every worker keeps its own, use the pid to tell them apart.
+    """
+
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, Format=None):
+        return Response(
+            {
+                'pid': os.getpid(),
+                'fan_out': FanOut.get_metrics(),
+                'salesforce': SalesforceClient.get_metrics(),
+            },
+            status=status.HTTP_200_OK,
+        )
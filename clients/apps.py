@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ClientsConfig(AppConfig):
     name = 'clients'
+
+    def ready(self):
+        # Registers the token authentication cache invalidation
+        from .signals import connect_signals
+
+        connect_signals()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import signal
+
+from django.core.management.base import BaseCommand
+
+from api.job_queue import JobQueue
+
+
+class Command(BaseCommand):
+    help = 'Runs the background jobs worker, until it gets SIGTERM or SIGINT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst', action='store_true', help='Exit when there are no jobs left.'
+        )
+        parser.add_argument(
+            '--stats', action='store_true', help='Show the queue sizes and exit.'
+        )
+        parser.add_argument(
+            '--requeue-dead',
+            action='store_true',
+            help='Move the dead letters back to the queue and exit.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for name, value in JobQueue.get_metrics().items():
+                self.stdout.write(f'{name}: {value}')
+            return
+        if options['requeue_dead']:
+            self.stdout.write(f'{JobQueue.requeue_dead()} jobs requeued.')
+            return
+
+        # Finish the current batch before exiting, Heroku sends SIGTERM on every restart
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        JobQueue.work(burst=options['burst'], should_stop=lambda: bool(stopping))
@@ -92,8 +92,11 @@ class ClientOrg(models.Model):
         return ', '.join((str(x) for x in result))
 
     def new_client_request(self):
+        from .request_buffer import ClientRequestBuffer
+
         self.last_client_request_at = now()
-        self.save()
+        # Buffered and written in bulk by a background thread, no full row save per request
+        ClientRequestBuffer.add(self.id, self.last_client_request_at)
 
 
 class Token(models.Model):
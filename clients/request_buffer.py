@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from api.utils import Utils
+from .models import ClientOrg
+
+logger = Utils.init_logger(__name__)
+
+
+class ClientRequestBuffer(object):
+    """
+    Write-behind buffer for the ClientOrg.last_client_request_at updates.
+    Requests only record the timestamp in memory (last one wins for each client org) and a
+    background thread writes all the pending timestamps every CLIENT_REQUESTS_FLUSH_INTERVAL
+    seconds in one bulk UPDATE, so read endpoints don't need a database write anymore.
+    Whatever is still pending when the worker exits is flushed at exit.
+    """
+
+    _pending = {}
+    _lock = threading.Lock()
+    _flusher = None
+
+    @classmethod
+    def add(cls, client_org_id, request_at):
+        with cls._lock:
+            cls._pending[client_org_id] = request_at
+            # Started lazily so each forked worker gets its own thread
+            if cls._flusher is None or not cls._flusher.is_alive():
+                cls._flusher = threading.Thread(
+                    target=cls._flush_periodically,
+                    name='client-requests-flusher',
+                    daemon=True,
+                )
+                cls._flusher.start()
+
+    @classmethod
+    def flush(cls):
+        """
+        Writes all the pending timestamps to the database and returns how many were written.
+        """
+        with cls._lock:
+            pending, cls._pending = cls._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            ClientOrg.objects.bulk_update(
+                [
+                    ClientOrg(id=client_org_id, last_client_request_at=request_at)
+                    for client_org_id, request_at in pending.items()
+                ],
+                ['last_client_request_at'],
+            )
+        except Exception:
+            # Put them back for the next flush, unless a newer request came meanwhile
+            with cls._lock:
+                for client_org_id, request_at in pending.items():
+                    cls._pending.setdefault(client_org_id, request_at)
+            raise
+        logger.debug(f'Flushed {len(pending)} client request timestamps.')
+        return len(pending)
+
+    @classmethod
+    def _flush_periodically(cls):
+        while True:
+            time.sleep(settings.CLIENT_REQUESTS_FLUSH_INTERVAL)
+            cls._safe_flush()
+            # Don't keep an idle connection open between flushes
+            connection.close()
+
+    @classmethod
+    def _safe_flush(cls):
+        try:
+            cls.flush()
+        except Exception as ex:
+            logger.error(
+                f'Error flushing client request timestamps. Exception raised: {repr(ex)}.'
+            )
+
+
+atexit.register(ClientRequestBuffer._safe_flush)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import threading
+import time
+
+from django.conf import settings
+from urllib3.util.retry import Retry
+
+from api.http_pool import HttpPool
+from api.utils import Utils
+
+logger = Utils.init_logger(__name__)
+
+
+class SalesforceClient(object):
+    """
+    HTTP client for the Salesforce OAuth endpoints (login.salesforce.com).
+    Uses a worker shared keep-alive session with strict connect/read timeouts and retries the
+    5xx responses with exponential backoff a bounded number of times, so a slow Salesforce can't
+    hold a worker indefinitely. Keeps some request metrics per worker, exposed in /metrics.
+    """
+
+    RETRY_STATUSES = (500, 502, 503, 504)
+
+    _metrics = {
+        'requests': 0,
+        'retries': 0,
+        'server_errors': 0,
+        'failures': 0,
+        'total_seconds': 0.0,
+    }
+    _metrics_lock = threading.Lock()
+
+    @staticmethod
+    def _get_session():
+        retry = Retry(
+            total=settings.SALESFORCE_HTTP_MAX_RETRIES,
+            connect=settings.SALESFORCE_HTTP_MAX_RETRIES,
+            read=0,
+            status_forcelist=SalesforceClient.RETRY_STATUSES,
+            allowed_methods=frozenset(['POST']),
+            backoff_factor=settings.SALESFORCE_HTTP_BACKOFF_FACTOR,
+            raise_on_status=False,
+        )
+        return HttpPool.get_session(
+            'salesforce', settings.SALESFORCE_HTTP_POOL_SIZE, max_retries=retry
+        )
+
+    @staticmethod
+    def post(url, **kwargs):
+        """
+        Same as requests.post but through the pooled session. When the retries run out the last
+        response is returned, connection errors and timeouts raise requests.RequestException.
+        """
+        start = time.monotonic()
+        response = None
+        try:
+            response = SalesforceClient._get_session().post(
+                url,
+                timeout=(
+                    settings.SALESFORCE_HTTP_CONNECT_TIMEOUT,
+                    settings.SALESFORCE_HTTP_READ_TIMEOUT,
+                ),
+                **kwargs,
+            )
+            return response
+        finally:
+            elapsed = time.monotonic() - start
+            SalesforceClient._record(response, elapsed)
+            logger.debug(
+                f'Salesforce POST {url} => '
+                f'{response.status_code if response is not None else "failed"} '
+                f'in {elapsed:.3f}s'
+            )
+
+    @staticmethod
+    def get_metrics():
+        with SalesforceClient._metrics_lock:
+            return dict(SalesforceClient._metrics)
+
+    @staticmethod
+    def _record(response, elapsed):
+        with SalesforceClient._metrics_lock:
+            metrics = SalesforceClient._metrics
+            metrics['requests'] += 1
+            metrics['total_seconds'] += elapsed
+            if response is None:
+                metrics['failures'] += 1
+                return
+            retries = response.raw.retries if response.raw is not None else None
+            if retries is not None:
+                metrics['retries'] += len(retries.history)
+            if response.status_code >= 500:
+                metrics['server_errors'] += 1
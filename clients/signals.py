@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+from django.db.models.signals import post_delete, post_save
+
+from api.token_authentication import MyTokenAuthentication
+from .models import ClientOrg, Token
+
+
+def invalidate_client_org_token(sender, instance, **kwargs):
+    # Any write path (views, admin, shell) must drop the cached token of the client org,
+    # a cached client org keeps authenticating even after is_active flips
+    for key in Token.objects.filter(client_org_id=instance.id).values_list('key', flat=True):
+        MyTokenAuthentication.invalidate(key)
+
+
+def invalidate_token(sender, instance, **kwargs):
+    # Deleting a client org deletes its token in cascade, which gets here too
+    MyTokenAuthentication.invalidate(instance.key)
+
+
+def connect_signals():
+    post_save.connect(invalidate_client_org_token, sender=ClientOrg)
+    post_save.connect(invalidate_token, sender=Token)
+    post_delete.connect(invalidate_token, sender=Token)
@@ -1,7 +1,10 @@
 from rest_framework.test import APITestCase, APIClient
-from rest_framework import status
+from rest_framework import exceptions, status
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
+from api.caching import LocalCache
+from api.token_authentication import MyTokenAuthentication
 from .models import SalesforceOrg, ClientOrg, Token
 from .utils import ClientsUtils
 from redditors.utils import RedditorsUtils
@@ -120,3 +123,34 @@ class ClientsDataTests(APITestCase):
         self.assertEqual(response.data, {'detail': 'Account disconnected succesfully.'})
         self.assertFalse(ClientOrg.objects.all()[0].is_active)
         self.assertTrue(Token.objects.count() == 0)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+)
+class TokenAuthenticationCacheTests(TestCase):
+    def setUp(self):
+        LocalCache.clear()
+        self.token_key = ClientsUtils.insert_dummy_client()
+        self.authentication = MyTokenAuthentication()
+
+    def test_client_org_saved(self):
+        """
+		Function to test the cached token stops authenticating when its client org is
+		deactivated outside the views (like in the admin)
+		"""
+        client_org, _ = self.authentication.authenticate_credentials(self.token_key)
+        client_org = ClientOrg.objects.get(id=client_org.id)
+        client_org.is_active = False
+        client_org.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token_key)
+
+    def test_token_deleted(self):
+        """
+		Function to test the cached token stops authenticating when it's deleted
+		"""
+        self.authentication.authenticate_credentials(self.token_key)
+        Token.objects.filter(key=self.token_key).first().delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token_key)
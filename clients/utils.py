@@ -38,8 +38,12 @@ class ClientsUtils(object):
         Receives a ClientOrg instance and return the redditor name linked to this client org.
         """
         if client_org:
-            # Looking for the redditor with the id from the client org instance
-            redditor = Redditor.objects.get_or_none(id=client_org.redditor_id)
+            if ClientOrg.redditor.is_cached(client_org):
+                # Already loaded by the token authentication
+                redditor = client_org.redditor
+            else:
+                # Looking for the redditor with the id from the client org instance
+                redditor = Redditor.objects.get_or_none(id=client_org.redditor_id)
             if redditor:
                 return redditor.id, redditor.name
         return None, None
@@ -50,10 +54,14 @@ class ClientsUtils(object):
         Receives a ClientOrg instance and return the Salesforce org name linked to this client org.
         """
         if client_org:
-            # Looking for the redditor with the id from the client org instance
-            salesforce_org = SalesforceOrg.objects.get_or_none(
-                org_id=client_org.salesforce_org_id
-            )
+            if ClientOrg.salesforce_org.is_cached(client_org):
+                # Already loaded by the token authentication
+                salesforce_org = client_org.salesforce_org
+            else:
+                # Looking for the salesforce org with the id from the client org instance
+                salesforce_org = SalesforceOrg.objects.get_or_none(
+                    org_id=client_org.salesforce_org_id
+                )
             if salesforce_org:
                 return salesforce_org.org_id, salesforce_org.org_name
         return None, None
@@ -23,11 +23,14 @@ from .serializers import (
     SalesforceTokenDataSerializer,
 )
 from .utils import ClientsUtils
+from .salesforce_client import SalesforceClient
 from redditors.models import Redditor
 from redditors.serializers import RedditorSerializer
 from redditors.utils import RedditorsUtils
 from api.permissions import MyOauthConfirmPermission
 from api.token_authentication import MyTokenAuthentication
+from api.reddit_registry import RedditRegistry
+from api.reddit_tokens import RedditTokenCache
 from subreddits.utils import SubredditsUtils
 from api.utils import Utils
 
@@ -225,6 +228,10 @@ class ClientOauthConfirmation(APIView):
         )
         serializer.is_valid(raise_exception=True)
         client_org = serializer.save(salesforce_org=org, redditor=redditor)
+        # The refresh token changed, drop any reddit instance using the previous one
+        RedditRegistry.invalidate(client_org.id)
+        RedditTokenCache.delete(client_org.id)
+        SubredditsUtils.purge_subscriptions(client_org.id)
 
         # Create a random token for this client_org
         # This token will be used to authenticate the client org for all future requests
@@ -234,10 +241,8 @@ class ClientOauthConfirmation(APIView):
         token = Token.objects.create(client_org=client_org)
         logger.debug(f'Bearer token generated: {token.key}')
 
-        subreddits = []
-        if reddit_code != 'dummy':
-            for sub in reddit.user.subreddits():
-                subreddits.append(SubredditsUtils.get_subreddit_data_simple(sub))
+        # Also leaves the subscriptions in cache for the next requests of the client
+        subreddits = SubredditsUtils.get_subscriptions(reddit, client_org)
 
         # Return redditor data + subscriptions + token generated
         redditor_data.update(subscriptions=subreddits, bearer_token=token.key)
@@ -260,9 +265,9 @@ class Client(APIView):
         logger.info('Client information request =>')
 
         # Gets the reddit instance from the user in request (ClientOrg)
-        reddit, _ = Utils.new_client_request(request.user)
+        reddit, client_org = Utils.new_client_request(request.user)
 
-        subreddits = []
+        subreddits = SubredditsUtils.get_subscriptions(reddit, client_org)
         if reddit.read_only:
             redditor_data = RedditorsUtils.get_dummy_redditor_data()
             redditor_id = redditor_data['id']
@@ -271,8 +276,6 @@ class Client(APIView):
             api_redditor = reddit.user.me()
             redditor_id = api_redditor.id
             redditor_data = RedditorsUtils.get_redditor_data(api_redditor)
-            for sub in reddit.user.subreddits():
-                subreddits.append(SubredditsUtils.get_subreddit_data_simple(sub))
 
         # Create or update redditor object for this client
         redditor = Redditor.objects.get_or_none(id=redditor_id)
@@ -298,11 +301,17 @@ class Client(APIView):
 
         # Gets the reddit instance from the user in request (ClientOrg)
         reddit, client_org = Utils.new_client_request(request.user)
-        try:
-            reddit._core._authorizer.revoke()
-            logger.info('Reddit access token revoked succesfully.')
-        except Exception as ex:
-            logger.error(f'Error revoking access. Exception raised: {repr(ex)}.')
+        # The read only instance is shared by all the requests, never revoke its token
+        if not reddit.read_only:
+            try:
+                reddit._core._authorizer.revoke()
+                logger.info('Reddit access token revoked succesfully.')
+            except Exception as ex:
+                logger.error(f'Error revoking access. Exception raised: {repr(ex)}.')
+        if client_org:
+            RedditRegistry.invalidate(client_org.id)
+            RedditTokenCache.delete(client_org.id)
+            SubredditsUtils.purge_subscriptions(client_org.id)
 
         # Now I need to delete the oauth_token from database and change the status to inactive
         _, salesforce_org_name = ClientsUtils.get_salesforce_org_id_name(client_org)
@@ -424,48 +433,56 @@ class SalesforceOauthCallback(APIView):
                     logger.info('Salesforce oauth code saved in cache succesfully!')
 
                     # Create request to ask for access_token
-                    req = self._make_token_request(code)
-                    logger.debug(req.status_code)
-
-                    if req.status_code == 200:
-                        logger.info('Token request successful!')
-                        response_json = req.json()
-                        logger.debug(f'Response JSON: {response_json}')
-
-                        if self._signature_verifies(response_json):
-                            logger.info('Signature verified succesfully!')
-                            # Save the instance_url and access token here...
-                            instance_url = response_json['instance_url']
-                            access_token = response_json['access_token']
-                            refresh_token = response_json['refresh_token']
-
-                            org = SalesforceOrg.objects.get_or_none(org_id=org_id)
-                            logger.debug(f'Org data: {org}')
-                            if org:
-                                serializer = SalesforceOrgSerializer(
-                                    instance=org,
-                                    data={
-                                        'instance_url': instance_url,
-                                        'access_token': access_token,
-                                        'refresh_token': refresh_token,
-                                    },
-                                    partial=True,
-                                )
-                                serializer.is_valid(raise_exception=True)
-                                serializer.save()
+                    try:
+                        req = self._make_token_request(code)
+                    except requests.RequestException as ex:
+                        error_msg = (
+                            'Error requesting the Salesforce access token. '
+                            f'Exception raised: {repr(ex)}.'
+                        )
+                        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+                    else:
+                        logger.debug(req.status_code)
+
+                        if req.status_code == 200:
+                            logger.info('Token request successful!')
+                            response_json = req.json()
+                            logger.debug(f'Response JSON: {response_json}')
+
+                            if self._signature_verifies(response_json):
+                                logger.info('Signature verified succesfully!')
+                                # Save the instance_url and access token here...
+                                instance_url = response_json['instance_url']
+                                access_token = response_json['access_token']
+                                refresh_token = response_json['refresh_token']
+
+                                org = SalesforceOrg.objects.get_or_none(org_id=org_id)
+                                logger.debug(f'Org data: {org}')
+                                if org:
+                                    serializer = SalesforceOrgSerializer(
+                                        instance=org,
+                                        data={
+                                            'instance_url': instance_url,
+                                            'access_token': access_token,
+                                            'refresh_token': refresh_token,
+                                        },
+                                        partial=True,
+                                    )
+                                    serializer.is_valid(raise_exception=True)
+                                    serializer.save()
+                                else:
+                                    error_msg = (
+                                        f'Org with id: {org_id} not found in database.'
+                                    )
+                                    status_code = status.HTTP_406_NOT_ACCEPTABLE
+
+                                redirect_instance = instance_url
                             else:
-                                error_msg = (
-                                    f'Org with id: {org_id} not found in database.'
-                                )
-                                status_code = status.HTTP_406_NOT_ACCEPTABLE
-
-                            redirect_instance = instance_url
+                                error_msg = 'Invalid signature provided. The identity URL may be corrupted'
+                                status_code = status.HTTP_401_UNAUTHORIZED
                         else:
-                            error_msg = 'Invalid signature provided. The identity URL may be corrupted'
-                            status_code = status.HTTP_401_UNAUTHORIZED
-                    else:
-                        error_msg = req.text
-                        status_code = status.HTTP_417_EXPECTATION_FAILED
+                            error_msg = req.text
+                            status_code = status.HTTP_417_EXPECTATION_FAILED
 
         # Update cache oauth_state with error msg
         if error_msg:
@@ -494,7 +511,7 @@ class SalesforceOauthCallback(APIView):
             'code': code,
         }
 
-        return requests.post(self.endpoint_url, headers=headers, params=payload)
+        return SalesforceClient.post(self.endpoint_url, headers=headers, params=payload)
 
     def _signature_verifies(self, response_json):
         # Here I need to verify the signature in the json
@@ -592,13 +609,18 @@ class SalesforceToken(APIView):
         }
         if refresh_token:
             # Now call Salesforce oauth revoke endpoint
-            req = self._make_revoke_request(refresh_token)
-            response_text = req.text
-            if req.status_code == 200:
-                response_data['revoke_result'] = 'Oauth token revoked successfully.'
+            try:
+                req = self._make_revoke_request(refresh_token)
+            except requests.RequestException as ex:
+                logger.error(f'Error trying to revoke oauth token: {repr(ex)}')
+                response_data['revoke_result'] = f'Exception raised: {repr(ex)}.'
             else:
-                logger.debug(f'Error trying to revoke oauth token: {response_text}')
-                response_data['revoke_result'] = f'{req.status_code}:{response_text}'
+                response_text = req.text
+                if req.status_code == 200:
+                    response_data['revoke_result'] = 'Oauth token revoked successfully.'
+                else:
+                    logger.debug(f'Error trying to revoke oauth token: {response_text}')
+                    response_data['revoke_result'] = f'{req.status_code}:{response_text}'
         else:
             response_data['revoke_result'] = 'No refresh token found to revoke.'
 
@@ -607,4 +629,6 @@ class SalesforceToken(APIView):
     def _make_revoke_request(self, refresh_token):
         headers = {'Content-Type': 'application/x-www-form-urlencoded'}
         payload = {'token': refresh_token}
-        return requests.post(self.revoke_endpoint_url, headers=headers, data=payload)
+        return SalesforceClient.post(
+            self.revoke_endpoint_url, headers=headers, data=payload
+        )
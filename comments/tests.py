@@ -1,7 +1,9 @@
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from django.test import SimpleTestCase
 from django.urls import reverse
 from clients.utils import ClientsUtils
+from .utils import CommentsUtils
 
 
 class CommentsTests(APITestCase):
@@ -138,3 +140,40 @@ class CommentsTests(APITestCase):
         response = self.client.get(url, {'limit': 1, 'flat': True, 'offset': 1})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(len(response.data['replies']) == 1)
+
+
+class CommentsSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        # Submission t3_s with comments a and b, a has the reply c and c the reply d.
+        # b has more replies than the loaded ones
+        self.snapshot = {
+            'root': 't3_s',
+            'comments': {id: {'id': id} for id in ('a', 'b', 'c', 'd')},
+            'children': {'t3_s': ['a', 'b'], 't1_a': ['c'], 't1_c': ['d']},
+            'incomplete': ['t1_b'],
+        }
+
+    def test_snapshot_page(self):
+        """
+        Function to test the pages of the top level comments and of all of them flattened.
+        """
+        page = CommentsUtils.get_snapshot_page(self.snapshot, False, 5, 0)
+        self.assertEqual([comment['id'] for comment in page], ['a', 'b'])
+        page = CommentsUtils.get_snapshot_page(self.snapshot, True, 2, 1)
+        self.assertEqual([comment['id'] for comment in page], ['b', 'c'])
+        self.assertEqual(CommentsUtils.get_snapshot_page(self.snapshot, True, 5, 4), [])
+
+    def test_sub_snapshot(self):
+        """
+        Function to test the replies snapshots taken from the submission snapshot.
+        """
+        sub_snapshot = CommentsUtils._make_sub_snapshot(self.snapshot, 't1_a')
+        self.assertEqual(sub_snapshot['root'], 't1_a')
+        self.assertEqual(set(sub_snapshot['comments']), {'c', 'd'})
+        self.assertEqual(sub_snapshot['children'], {'t1_a': ['c'], 't1_c': ['d']})
+        page = CommentsUtils.get_snapshot_page(sub_snapshot, True, 5, 0)
+        self.assertEqual([comment['id'] for comment in page], ['c', 'd'])
+
+        # Missing replies, or a comment the snapshot does not have
+        self.assertIsNone(CommentsUtils._make_sub_snapshot(self.snapshot, 't1_b'))
+        self.assertIsNone(CommentsUtils._make_sub_snapshot(self.snapshot, 't1_x'))
@@ -1,17 +1,28 @@
 #!/usr/bin/env python3
+from collections import deque
 from datetime import datetime
+
+from django.conf import settings
+from praw.models import MoreComments
 from prawcore import NotFound
 from redditors.utils import RedditorsUtils
 from subreddits.utils import SubredditsUtils
 from submissions.utils import SubmissionsUtils
+from api.caching import CacheNamespace
+from api.fan_out import FanOut
+from api.reddit_registry import RedditRegistry
+from api.single_flight import SingleFlight
 
 
 class CommentsUtils(object):
+    _snapshots_cache = CacheNamespace('comments_snapshot', 'COMMENTS_SNAPSHOT_TTL')
+    _replies_cache = CacheNamespace('replies_snapshot', 'COMMENTS_SNAPSHOT_TTL')
+
     @staticmethod
     def get_comment_if_exists(id, reddit):
         comment = reddit.comment(id)
         try:
-            comment._fetch()
+            SingleFlight.fetch(comment)
         except:
             return None
         return comment
@@ -30,24 +41,178 @@ class CommentsUtils(object):
             'has_replies': len(comment.replies) > 0,
         }
 
+    @staticmethod
+    def _get_subreddit_data_simple(subreddit):
+        # Taken from the subreddit details cache when there, no need to fetch the subreddit
+        cached = SubredditsUtils.get_cached_subreddit_data(subreddit.display_name)
+        if cached is not None:
+            subreddit_data, _, _ = cached
+            return {
+                key: subreddit_data[key]
+                for key in (
+                    'id',
+                    'name',
+                    'display_name',
+                    'public_description',
+                    'created_utc',
+                    'subscribers',
+                )
+            }
+        return SubredditsUtils.get_subreddit_data_simple(subreddit)
+
     @staticmethod
     def get_comment_data(comment):
+        # Author, submission and subreddit are independent lazy fetches, all at the same time
+        author, submission, subreddit = FanOut.run(
+            lambda: RedditorsUtils.get_redditor_data_simple(comment.author),
+            lambda: SubmissionsUtils.get_submission_data_simple(comment.submission),
+            lambda: CommentsUtils._get_subreddit_data_simple(comment.subreddit),
+        )
         return {
             'id': comment.id,
             'body': comment.body,
             'created_utc': datetime.utcfromtimestamp(comment.created_utc),
-            'author': RedditorsUtils.get_redditor_data_simple(comment.author),
+            'author': author,
             'score': comment.score,
             'permalink': comment.permalink,
             'link_id': comment.link_id,
             'parent_id': comment.parent_id,
-            'submission': SubmissionsUtils.get_submission_data_simple(
-                comment.submission
-            ),
-            'subreddit': SubredditsUtils.get_subreddit_data_simple(comment.subreddit),
+            'submission': submission,
+            'subreddit': subreddit,
             'has_replies': len(comment.replies) > 0,
             'is_submitter': comment.is_submitter,
             'distinguished': comment.distinguished,
             'edited': bool(comment.edited),
             'stickied': comment.stickied,
         }
+
+    @staticmethod
+    def _make_snapshot(root_fullname, forest):
+        """
+        Compact snapshot of the comment forest: the simple data of every comment and the ids of
+        the children of every node, in the order Reddit returned them. The fullnames of the nodes
+        with more children than the ones loaded are kept as incomplete.
+        """
+        incomplete = {
+            item.parent_id for item in forest.list() if isinstance(item, MoreComments)
+        }
+        forest.replace_more(limit=0)
+        comments, children = {}, {root_fullname: []}
+        for comment in forest.list():
+            comments[comment.id] = CommentsUtils.get_comment_data_simple(comment)
+            children.setdefault(comment.parent_id, []).append(comment.id)
+        return {
+            'root': root_fullname,
+            'comments': comments,
+            'children': children,
+            'incomplete': list(incomplete),
+        }
+
+    @staticmethod
+    def _descendant_ids(snapshot, fullname):
+        # Breadth first, the same order as CommentForest.list()
+        ids = []
+        queue = deque(snapshot['children'].get(fullname, []))
+        while queue:
+            id = queue.popleft()
+            ids.append(id)
+            queue.extend(snapshot['children'].get(f't1_{id}', []))
+        return ids
+
+    @staticmethod
+    def _make_sub_snapshot(snapshot, fullname):
+        # Snapshot of the subtree of the comment, None if the snapshot doesn't have it all
+        if fullname[3:] not in snapshot['comments']:
+            # Behind a MoreComments or past the snapshot limit, its replies are unknown
+            return None
+        ids = CommentsUtils._descendant_ids(snapshot, fullname)
+        fullnames = {fullname, *[f't1_{id}' for id in ids]}
+        if fullnames.intersection(snapshot['incomplete']):
+            return None
+        return {
+            'root': fullname,
+            'comments': {id: snapshot['comments'][id] for id in ids},
+            'children': {
+                parent: children
+                for parent, children in snapshot['children'].items()
+                if parent in fullnames
+            },
+            'incomplete': [],
+        }
+
+    @staticmethod
+    def get_snapshot_page(snapshot, flat, limit, offset):
+        """
+        Returns the limit comments after offset of the snapshot, the top level ones or all of
+        them flattened.
+        """
+        if flat:
+            ids = CommentsUtils._descendant_ids(snapshot, snapshot['root'])
+        else:
+            ids = snapshot['children'].get(snapshot['root'], [])
+        return [snapshot['comments'][id] for id in ids[offset : offset + limit]]
+
+    @staticmethod
+    def _is_shareable(submission):
+        # Not every user can see the private and quarantined subreddits
+        return not (
+            getattr(submission, 'subreddit_type', None) == 'private'
+            or getattr(submission, 'quarantine', False)
+        )
+
+    @staticmethod
+    def get_comments_snapshot(id, reddit, sort):
+        """
+        Returns the comments snapshot of the submission with the sort provided, or None if the
+        submission does not exist. Snapshots are kept in cache COMMENTS_SNAPSHOT_TTL seconds so
+        all the pages come from one fetch, except the ones of private or quarantined subreddits.
+        """
+        key = f'{id}_{sort}'
+        snapshot = CommentsUtils._snapshots_cache.get(key)
+        if snapshot is None:
+            submission = reddit.submission(id=id)
+            submission.comment_sort = sort
+            submission.comment_limit = settings.COMMENTS_SNAPSHOT_LIMIT
+            try:
+                SingleFlight.fetch(submission)
+            except:
+                return None
+            snapshot = CommentsUtils._make_snapshot(submission.fullname, submission.comments)
+            if CommentsUtils._is_shareable(submission):
+                CommentsUtils._snapshots_cache.set(key, snapshot)
+        return snapshot
+
+    @staticmethod
+    def get_replies_snapshot(id, reddit):
+        """
+        Returns the replies snapshot of the comment, or None if the comment does not exist.
+        It is taken from the snapshot of its submission (default sort) when that one has all the
+        comment replies, and shared by everyone like it. Otherwise the comment replies are
+        fetched, and that snapshot is only kept for the same reddit identity, the comment may be
+        in a private or quarantined subreddit.
+        """
+        own_key = f'{RedditRegistry.identity(reddit)}:{id}'
+        cached = CommentsUtils._replies_cache.get_many([id, own_key])
+        snapshot = cached.get(id, cached.get(own_key))
+        if snapshot is not None:
+            return snapshot
+
+        comment = CommentsUtils.get_comment_if_exists(id, reddit)
+        if comment is None:
+            return None
+        # Only the shareable submissions snapshots are in cache
+        submission_snapshot = CommentsUtils._snapshots_cache.get(
+            f'{comment.link_id[3:]}_best'
+        )
+        if submission_snapshot is not None:
+            snapshot = CommentsUtils._make_sub_snapshot(
+                submission_snapshot, comment.fullname
+            )
+        if snapshot is not None:
+            CommentsUtils._replies_cache.set(id, snapshot)
+            return snapshot
+
+        comment.refresh()
+        snapshot = CommentsUtils._make_snapshot(comment.fullname, comment.replies)
+        CommentsUtils._replies_cache.set(own_key, snapshot)
+        return snapshot
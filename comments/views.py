@@ -286,25 +286,12 @@ class CommentReplies(APIView):
 
         return limit, offset
 
-    def _get_replies(self, comment, flat):
-        comment.replies.replace_more(limit=0)
-        if flat:
-            return comment.replies.list()
-        else:
-            return comment.replies
-
     def get(self, request, id, Format=None):
         logger.info('-' * 100)
         logger.info(f'Comment "{id}" replies =>')
 
         # Gets the reddit instance from the user in request (ClientOrg)
         reddit, _ = Utils.new_client_request(request.user)
-        # Get submission instance with the id provided
-        comment = CommentsUtils.get_comment_if_exists(id, reddit)
-        if comment is None:
-            raise exceptions.NotFound(
-                detail={'detail': f'No comment exists with the id: {id}.'}
-            )
 
         flat = request.query_params.get('flat', False)
         limit = request.query_params.get('limit', 10)
@@ -314,21 +301,16 @@ class CommentReplies(APIView):
         logger.info(f'Limit: {limit}')
         logger.info(f'Offset: {offset}')
 
-        # Here I need to call refresh() for some reason to get the actual replies count
-        comment.refresh()
-        logger.info(f'Total top replies: {len(comment.replies)}')
-
-        # Get replies generator from the comment instance
-        replies_generator = self._get_replies(comment, flat)
-
-        replies = []
-        for index, reply in enumerate(replies_generator, start=1):
-            if index > offset:
-                replies.append(CommentsUtils.get_comment_data_simple(reply))
-                # For some reason the comment_limit attr in the submission instance does not work
-                # as suggested in docs, so breaking here when it reaches limit comments
-                if len(replies) > limit - 1:
-                    break
+        # All the pages come from the same replies snapshot of the comment
+        snapshot = CommentsUtils.get_replies_snapshot(id, reddit)
+        if snapshot is None:
+            raise exceptions.NotFound(
+                detail={'detail': f'No comment exists with the id: {id}.'}
+            )
+        logger.info(
+            f'Total top replies: {len(snapshot["children"].get(snapshot["root"], []))}'
+        )
+        replies = CommentsUtils.get_snapshot_page(snapshot, flat, limit, offset)
 
         logger.info(f'Total comments retrieved: {len(replies)}')
 
@@ -0,0 +1,15 @@
+"""
+Gunicorn config for the web process, see Procfile.
+
+Django 2.2 and praw are synchronous, so instead of async views the workers are threaded: a request
+waiting for Reddit only blocks its own thread, and every worker can keep GUNICORN_THREADS upstream
+calls in flight. The number of workers is still taken from WEB_CONCURRENCY.
+Keep REDDIT_HTTP_POOL_SIZE at least as big as the threads, and mind that each thread keeps its own
+database connection.
+"""
+import os
+
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+# A thread may wait for Reddit up to REDDIT_HTTP_READ_TIMEOUT (plus retries)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
@@ -1,10 +1,20 @@
 #!/usr/bin/env python3
 from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from prawcore import NotFound
+
+from api.caching import CacheNamespace
+from api.job_queue import JobQueue
+from api.single_flight import SingleFlight
 from .serializers import RedditorSerializer
 from .models import Redditor
 
 
 class RedditorsUtils(object):
+    _profiles_cache = CacheNamespace('redditor_profile', 'REDDITOR_PROFILE_TTL')
+
     @staticmethod
     def create_or_update(redditor_data):
         # Create or update redditor object
@@ -13,36 +23,75 @@ class RedditorsUtils(object):
         serializer.is_valid(raise_exception=True)
         return serializer.save()
 
+    @staticmethod
+    def enqueue_save(redditor_data):
+        JobQueue.enqueue('redditors.utils.RedditorsUtils.save_redditors', redditor_data)
+
+    @staticmethod
+    def save_redditors(payloads):
+        """
+        Job handler for the enqueue_save() jobs, only the last data of each redditor is saved.
+        """
+        latest = {redditor_data['id']: redditor_data for redditor_data in payloads}
+        with transaction.atomic():
+            for redditor_data in latest.values():
+                RedditorsUtils.create_or_update(redditor_data)
+
     @staticmethod
     def get_redditor_if_exists(name, reddit):
         redditor = reddit.redditor(name)
         try:
-            redditor._fetch()
+            SingleFlight.fetch(redditor)
         except:
             return None
         return redditor
 
+    @staticmethod
+    def _make_profile(redditor):
+        return {
+            'id': redditor.id,
+            'name': redditor.name,
+            'created_utc': datetime.utcfromtimestamp(redditor.created_utc),
+            'icon_img': redditor.icon_img,
+            'comment_karma': redditor.comment_karma,
+            'link_karma': redditor.link_karma,
+        }
+
     @staticmethod
     def get_redditor_data_simple(redditor):
+        """
+        Returns the redditor profile, from the shared profiles cache when possible so the same
+        authors are not fetched again for every submission or comment. Profiles are kept
+        REDDITOR_PROFILE_TTL seconds, the deleted or suspended ones (None) for less time.
+        """
+        if not redditor:
+            return None
+        key = redditor.name.lower()
+        entry = RedditorsUtils._profiles_cache.get(key)
+        if entry is not None:
+            return entry['profile']
+
         # I need to try fetch for the redditor data here
         try:
-            if redditor:
-                redditor._fetch()
-                return {
-                    'id': redditor.id,
-                    'name': redditor.name,
-                    'created_utc': datetime.utcfromtimestamp(redditor.created_utc),
-                    'icon_img': redditor.icon_img,
-                    'comment_karma': redditor.comment_karma,
-                    'link_karma': redditor.link_karma,
-                }
-            else:
-                return None
+            SingleFlight.fetch(redditor)
+            profile = RedditorsUtils._make_profile(redditor)
+        except (NotFound, AttributeError):
+            # Suspended accounts have no id or created_utc
+            RedditorsUtils._profiles_cache.set(
+                key, {'profile': None}, settings.REDDITOR_PROFILE_NEGATIVE_TTL
+            )
+            return None
         except:
             return None
+        RedditorsUtils._profiles_cache.set(key, {'profile': profile})
+        return profile
 
     @staticmethod
     def get_redditor_data(redditor):
+        # The redditor is already fetched, keep its profile for the next requests
+        RedditorsUtils._profiles_cache.set(
+            redditor.name.lower(), {'profile': RedditorsUtils._make_profile(redditor)}
+        )
         return {
             'id': redditor.id,
             'name': redditor.name,
@@ -83,7 +83,7 @@ class RedditorInfo(APIView):
 
         # Get data I need from subreddit instance
         redditor_data = RedditorsUtils.get_redditor_data(redditor)
-        # Enqueue this in a redis queue job later
-        # RedditorsUtils.create_or_update(redditor_data)
+        # The Redditor object is saved by the jobs worker, no need to wait for it
+        RedditorsUtils.enqueue_save(redditor_data)
 
         return Response(redditor_data, status=status.HTTP_200_OK)
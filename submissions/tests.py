@@ -151,3 +151,15 @@ class SubmissionsTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(len(response.data['comments']) == 1)
         self.assertTrue(response.data['sort_type'] == 'top' and response.data['flat'])
+
+    def test_submission_job(self):
+        """
+        Function to test submission_job endpoint with an unknown job id.
+        """
+        url = reverse('submissions:submission_job', args=['1234567890'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(
+            response.data['error']['messages'][0],
+            'detail: No submission job exists with the id: 1234567890.',
+        )
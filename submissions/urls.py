@@ -4,6 +4,7 @@ import submissions.views as views
 app_name = 'submissions'
 
 urlpatterns = [
+    path('jobs/<str:id>', views.SubmissionJob.as_view(), name='submission_job'),
     path('<str:id>', views.Submission.as_view(), name='submission'),
     path('<str:id>/vote', views.SubmissionVote.as_view(), name='submission_vote'),
     path(
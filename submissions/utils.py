@@ -1,14 +1,29 @@
 #!/usr/bin/env python3
+import time
+import uuid
 from datetime import datetime
+
+from django.conf import settings
+
+from clients.models import ClientOrg
 from redditors.utils import RedditorsUtils
+from api.caching import CacheNamespace
+from api.job_queue import JobQueue
+from api.single_flight import SingleFlight
+from api.utils import Utils
+
+logger = Utils.init_logger(__name__)
 
 
 class SubmissionsUtils(object):
+    # Updated by the jobs worker, the web workers can't keep their own copy
+    _jobs_cache = CacheNamespace('submission_jobs', 'SUBMISSION_JOB_TTL', local_ttl=0)
+
     @staticmethod
     def get_sub_if_exists(id, reddit):
         sub = reddit.submission(id=id)
         try:
-            sub._fetch()
+            SingleFlight.fetch(sub)
         except:
             return None
         return sub
@@ -85,3 +100,103 @@ class SubmissionsUtils(object):
             'over_18': False,
         }
 
+    @staticmethod
+    def enqueue_media_submission(client_org, subreddit_name, kind, title, media, options):
+        """
+        Enqueues an image or video/gif submission, the media is uploaded by the jobs worker.
+        kind is 'image' or 'video', media the submit_image/submit_video media arguments (the
+        paths must be readable by the jobs worker) and options the common submit arguments.
+        Returns the job data, its status is kept SUBMISSION_JOB_TTL seconds.
+        """
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'pending',
+            'kind': kind,
+            'subreddit': subreddit_name,
+            'title': title,
+            'submission_id': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        SubmissionsUtils._jobs_cache.set(job['id'], dict(job, client_org_id=client_org.id))
+        JobQueue.enqueue(
+            'submissions.utils.SubmissionsUtils.submit_media',
+            {
+                'job_id': job['id'],
+                'client_org_id': client_org.id,
+                'kind': kind,
+                'subreddit': subreddit_name,
+                'title': title,
+                'media': media,
+                'options': options,
+            },
+        )
+        return job
+
+    @staticmethod
+    def get_media_submission_job(job_id, client_org):
+        """
+        Returns the job data if it exists and belongs to the client org, None otherwise.
+        """
+        job = SubmissionsUtils._jobs_cache.get(job_id)
+        if job is None or client_org is None or job.pop('client_org_id') != client_org.id:
+            return None
+        return job
+
+    @staticmethod
+    def _update_media_submission_job(job_id, **fields):
+        job = SubmissionsUtils._jobs_cache.get(job_id)
+        if job is not None:
+            job.update(fields, updated_at=time.time())
+            SubmissionsUtils._jobs_cache.set(job_id, job)
+
+    @staticmethod
+    def submit_media(payloads):
+        """
+        Job handler for the enqueue_media_submission() jobs. It never raises, so the job queue
+        never runs a media submission twice: the post may have been created even when it failed.
+        The job gets the error instead.
+        """
+        for payload in payloads:
+            job_id = payload['job_id']
+            try:
+                SubmissionsUtils._update_media_submission_job(job_id, status='running')
+                client_org = ClientOrg.objects.get_or_none(
+                    id=payload['client_org_id'], is_active=True
+                )
+                if client_org is None:
+                    raise ValueError('The client org is not active anymore.')
+                reddit = Utils.get_pooled_reddit_instance(client_org)
+                subreddit = reddit.subreddit(payload['subreddit'])
+                submit = (
+                    subreddit.submit_image
+                    if payload['kind'] == 'image'
+                    else subreddit.submit_video
+                )
+                # With the websocket Reddit tells the new submission when it is processed
+                submission = submit(
+                    payload['title'],
+                    **payload['media'],
+                    **payload['options'],
+                    timeout=settings.SUBMISSION_MEDIA_TIMEOUT,
+                )
+            except Exception as ex:
+                logger.error(
+                    f'Error in media submission job {job_id}. Exception raised: {repr(ex)}.'
+                )
+                result = {'status': 'failed', 'error': repr(ex)}
+            else:
+                logger.info(
+                    f'Media submission job {job_id} created submission {submission.id}.'
+                )
+                result = {'status': 'succeeded', 'submission_id': submission.id}
+
+            try:
+                SubmissionsUtils._update_media_submission_job(job_id, **result)
+            except Exception as ex:
+                logger.error(
+                    f'Could not save the result of media submission job {job_id} {result}. '
+                    f'Exception raised: {repr(ex)}.'
+                )
@@ -320,27 +320,12 @@ class SubmissionComments(APIView):
 
         return sort, limit, offset
 
-    def _get_comments(self, submission, sort, limit, flat):
-        submission.comment_sort = sort
-        submission.comment_limit = limit
-        submission.comments.replace_more(limit=0)
-        if flat:
-            return submission.comments.list()
-        else:
-            return submission.comments
-
     def get(self, request, id, Format=None):
         logger.info('-' * 100)
         logger.info(f'Submission "{id}" comments =>')
 
         # Gets the reddit instance from the user in request (ClientOrg)
         reddit, _ = Utils.new_client_request(request.user)
-        # Get submission instance with the id provided
-        submission = SubmissionsUtils.get_sub_if_exists(id, reddit)
-        if not submission:
-            raise exceptions.NotFound(
-                detail={'detail': f'No submission exists with the id: {id}.'}
-            )
 
         sort = request.query_params.get('sort', 'best')
         flat = request.query_params.get('flat', False)
@@ -353,17 +338,13 @@ class SubmissionComments(APIView):
         logger.info(f'Offset: {offset}')
         logger.info(f'Flat: {flat}')
 
-        # Get submissions generator according to query_params and with the limit + offset?
-        comments_generator = self._get_comments(submission, sort, limit + offset, flat)
-
-        comments = []
-        for index, comment in enumerate(comments_generator, start=1):
-            if index > offset:
-                comments.append(CommentsUtils.get_comment_data_simple(comment))
-                # For some reason the comment_limit attr in the submission instance does not work
-                # as suggested in docs, so breaking here when it reaches limit comments
-                if len(comments) > limit - 1:
-                    break
+        # All the pages come from the same comments snapshot of the submission
+        snapshot = CommentsUtils.get_comments_snapshot(id, reddit, sort)
+        if snapshot is None:
+            raise exceptions.NotFound(
+                detail={'detail': f'No submission exists with the id: {id}.'}
+            )
+        comments = CommentsUtils.get_snapshot_page(snapshot, flat, limit, offset)
 
         logger.info(f'Total comments retrieved: {len(comments)}')
 
@@ -427,3 +408,26 @@ class SubmissionComments(APIView):
             logger.warn(msg)
 
         return Response({'detail': msg, 'comment': comment_data}, status=status_code)
+
+
+class SubmissionJob(APIView):
+    """
+    API endpoint to get the status of an image or video/gif submission job by its id.
+    The status is pending, running, succeeded (with the submission_id) or failed (with the error).
+    """
+
+    authentication_classes = [MyTokenAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id, Format=None):
+        logger.info('-' * 100)
+        logger.info(f'Submission job "{id}" status =>')
+
+        _, client_org = Utils.new_client_request(request.user)
+        job = SubmissionsUtils.get_media_submission_job(id, client_org)
+        if job is None:
+            raise exceptions.NotFound(
+                detail={'detail': f'No submission job exists with the id: {id}.'}
+            )
+
+        return Response(job, status=status.HTTP_200_OK)
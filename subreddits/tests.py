@@ -4,6 +4,7 @@ from django.urls import reverse
 from clients.utils import ClientsUtils
 from .models import Subreddit
 from clients.models import ClientOrg
+from .utils import SubredditsUtils
 
 
 class SubredditsTests(APITestCase):
@@ -49,6 +50,57 @@ class SubredditsTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue('test' in response.data['display_name'])
 
+    def test_subreddit_not_modified(self):
+        """
+        Function to test the conditional GET of the subreddit endpoint with the ETag.
+        """
+        url = reverse('subreddits:subreddit', args=['test'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.has_header('ETag'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_subreddit_connect_disconnect(self):
+        """
+        Function to test subreddit_connections endpoint when having the bearer token.
+        """
+        url = reverse('subreddits:subreddit_connections', args=['test'])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        subreddit_obj = Subreddit.objects.get(id=response.data['subreddit']['id'])
+        self.assertEqual(subreddit_obj.clients.count(), 1)
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(subreddit_obj.clients.count(), 0)
+
+    def test_subreddit_save_job(self):
+        """
+        Function to test the jobs handler that saves the Subreddit objects.
+        Only the last data of each subreddit in the batch is saved.
+        """
+        subreddit_data = {
+            'id': '2qh23',
+            'name': 't5_2qh23',
+            'display_name': 'test',
+            'description': '',
+            'description_html': None,
+            'public_description': '',
+            'created_utc': '2008-01-25T05:11:28',
+            'subscribers': 7352,
+            'spoilers_enabled': True,
+            'over18': False,
+            'can_assign_link_flair': True,
+            'can_assign_user_flair': True,
+        }
+        SubredditsUtils.save_subreddits(
+            [subreddit_data, dict(subreddit_data, subscribers=7353)]
+        )
+        self.assertEqual(Subreddit.objects.get(id='2qh23').subscribers, 7353)
+
     def test_subreddit_subscriptions(self):
         """
         Function to test subreddit_subscriptions endpoint when having the bearer token.
@@ -72,6 +124,23 @@ class SubredditsTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(len(response.data['rules']) > 0)
 
+    def test_subreddit_rules_purge(self):
+        """
+        Function to test purging the cached rules of a subreddit.
+        """
+        url = reverse('subreddits:subreddit_rules', args=['Python'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['detail'], 'Cached rules of r/Python purged.')
+
+        # Fetched again from Reddit
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(len(response.data['rules']) > 0)
+
     def test_subreddit_submissions(self):
         """
         Function to test subreddit_submissions endpoint when having the bearer token.
@@ -92,6 +161,32 @@ class SubredditsTests(APITestCase):
             response.data['sort_type'] == 'top' and response.data['offset'] == offset
         )
 
+    def test_subreddit_submissions_cursor(self):
+        """
+        Function to test the subreddit_submissions endpoint pages with the next cursor.
+        """
+        url = reverse('subreddits:subreddit_submissions', args=['test'])
+        response = self.client.get(url, {'sort': 'new', 'limit': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['submissions']), 10)
+        self.assertIsNotNone(response.data['next'])
+
+        next_response = self.client.get(
+            url, {'sort': 'new', 'limit': 10, 'after': response.data['next']}
+        )
+        self.assertEqual(next_response.status_code, status.HTTP_200_OK)
+        first_page_ids = {sub['id'] for sub in response.data['submissions']}
+        self.assertTrue(
+            all(
+                sub['id'] not in first_page_ids
+                for sub in next_response.data['submissions']
+            )
+        )
+
+        # Cursors are validated
+        response = self.client.get(url, {'after': 'not_a_cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def _subscribe_unsubscribe_request(self, action='subscribe'):
         url = reverse(f'subreddits:subscriptions')
         if action == 'subscribe':
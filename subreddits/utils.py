@@ -1,12 +1,38 @@
 #!/usr/bin/env python3
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from prawcore.exceptions import Forbidden, NotFound, Redirect
+
 from .models import Subreddit
 from .serializers import SubredditSerializer
 from clients.utils import ClientsUtils
+from submissions.utils import SubmissionsUtils
+from api.caching import CacheNamespace
+from api.job_queue import JobQueue
+from api.single_flight import SingleFlight
+from api.utils import Utils
 from datetime import datetime
 from rest_framework import status, exceptions
 
 
 class SubredditsUtils(object):
+    _resolutions_cache = CacheNamespace(
+        'subreddit_resolution', 'SUBREDDIT_RESOLUTION_TTL'
+    )
+    _details_cache = CacheNamespace('subreddit_details', 'SUBREDDIT_DETAILS_STALE_TTL')
+    _rules_cache = CacheNamespace('subreddit_rules', 'SUBREDDIT_RULES_TTL')
+    _windows_cache = CacheNamespace(
+        'submissions_window', 'SUBMISSIONS_WINDOW_TTL', version=2
+    )
+    # Updated by every subscription, the workers can't keep their own copy
+    _subscriptions_cache = CacheNamespace(
+        'subscriptions', 'SUBSCRIPTIONS_TTL', local_ttl=0
+    )
+
     @staticmethod
     def create_or_update(subreddit_data):
         # Create or update subreddit object for this client
@@ -16,32 +42,161 @@ class SubredditsUtils(object):
         return serializer.save()
 
     @staticmethod
-    def sub_exists(name, reddit):
-        try:
-            subreddits = reddit.subreddits.search_by_name(name, exact=True)
-        except:
-            return False, None
-        return True, subreddits
+    def enqueue_save(subreddit_data):
+        JobQueue.enqueue('subreddits.utils.SubredditsUtils.save_subreddits', subreddit_data)
 
     @staticmethod
-    def get_sub_if_exists(name, reddit):
-        exists, subreddits = SubredditsUtils.sub_exists(name, reddit)
-        if exists:
-            for sub in subreddits:
-                if name.lower() == sub.display_name.lower():
-                    return reddit.subreddit(name)
-        return None
+    def save_subreddits(payloads):
+        """
+        Job handler for the enqueue_save() jobs, only the last data of each subreddit is saved.
+        """
+        latest = {subreddit_data['id']: subreddit_data for subreddit_data in payloads}
+        with transaction.atomic():
+            for subreddit_data in latest.values():
+                SubredditsUtils.create_or_update(subreddit_data)
 
     @staticmethod
     def get_sub_if_available(name, reddit):
-        subreddit = SubredditsUtils.get_sub_if_exists(name, reddit)
-        try:
-            # Just check if I have access to the id attribute
-            if subreddit and subreddit.id:
+        """
+        Returns the subreddit instance for the name, or None if the subreddit does not exist or
+        is not accessible (private, banned, quarantined...).
+        Resolutions are kept in cache. Public subreddits for SUBREDDIT_RESOLUTION_TTL seconds,
+        then the instance is returned lazy and only fetched if its data is actually used.
+        Unknown names for SUBREDDIT_NEGATIVE_TTL seconds, and private ones too but only for the
+        read only requests, an authorized user may be an approved member.
+        Otherwise the about data is loaded with one request and the instance returned loaded.
+        """
+        resolutions_cache = SubredditsUtils._resolutions_cache
+        key = name.lower()
+        resolution = resolutions_cache.get(key)
+        if resolution is not None:
+            if resolution['available']:
+                subreddit = reddit.subreddit(resolution['display_name'])
+                subreddit.id = resolution['id']
+                # It may have been banned or made private since it was resolved
+                fetch = subreddit._fetch
+
+                def guarded_fetch():
+                    with SubredditsUtils.unavailable_as_not_found(subreddit):
+                        fetch()
+
+                subreddit._fetch = guarded_fetch
                 return subreddit
-        except:
-            pass
-        return None
+            if resolution['reason'] == 'not_found' or reddit.read_only:
+                return None
+
+        try:
+            subreddit = reddit.subreddit(name)
+            SingleFlight.fetch(subreddit)
+        except (Redirect, NotFound):
+            resolutions_cache.set(
+                key,
+                {'available': False, 'reason': 'not_found'},
+                settings.SUBREDDIT_NEGATIVE_TTL,
+            )
+            return None
+        except Forbidden:
+            if reddit.read_only:
+                resolutions_cache.set(
+                    key,
+                    {'available': False, 'reason': 'forbidden'},
+                    settings.SUBREDDIT_NEGATIVE_TTL,
+                )
+            return None
+        except Exception:
+            return None
+        # Reddit may answer with a different subreddit, like for r/random
+        if subreddit.display_name.lower() != name.lower():
+            return None
+
+        if subreddit.subreddit_type != 'private' and not getattr(
+            subreddit, 'quarantine', False
+        ):
+            resolutions_cache.set(
+                key,
+                {
+                    'available': True,
+                    'id': subreddit.id,
+                    'display_name': subreddit.display_name,
+                },
+            )
+        return subreddit
+
+    @staticmethod
+    @contextmanager
+    def _subscriptions_lock(client_org_id):
+        # Yields whether the lock of the client org cached subscriptions was taken in time
+        lock_key = f'{client_org_id}_lock'
+        deadline = time.monotonic() + settings.SUBSCRIPTIONS_LOCK_TIMEOUT
+        while not SubredditsUtils._subscriptions_cache.add(
+            lock_key, True, settings.SUBSCRIPTIONS_LOCK_TIMEOUT
+        ):
+            if time.monotonic() > deadline:
+                yield False
+                return
+            time.sleep(0.05)
+        try:
+            yield True
+        finally:
+            SubredditsUtils._subscriptions_cache.delete(lock_key)
+
+    @staticmethod
+    def get_subscriptions(reddit, client_org):
+        """
+        Returns the subreddits (simple data) the client reddit user is subscribed to. The list is
+        cached SUBSCRIPTIONS_TTL seconds for each client org, and kept updated by the
+        subscriptions made through subscribe_action().
+        A list fetched while a subscription changed is not cached, it may be missing the change.
+        """
+        if reddit.read_only:
+            return []
+        subscriptions_cache = SubredditsUtils._subscriptions_cache
+        subscriptions = subscriptions_cache.get(client_org.id)
+        if subscriptions is None:
+            generation = subscriptions_cache.get(f'{client_org.id}_generation')
+            subscriptions = [
+                SubredditsUtils.get_subreddit_data_simple(sub)
+                for sub in reddit.user.subreddits()
+            ]
+            with SubredditsUtils._subscriptions_lock(client_org.id) as locked:
+                if locked and generation == subscriptions_cache.get(
+                    f'{client_org.id}_generation'
+                ):
+                    subscriptions_cache.set(client_org.id, subscriptions)
+        return subscriptions
+
+    @staticmethod
+    def _write_subscription(client_org, subreddit, subscribe):
+        # Write-through to the cached list, if there is one the next get fetches it anyway.
+        # Every change gets a new generation, so the lists being fetched meanwhile aren't cached
+        subscriptions_cache = SubredditsUtils._subscriptions_cache
+        # The subreddit may be lazy, don't fetch it holding the lock
+        subreddit_data = (
+            SubredditsUtils.get_subreddit_data_simple(subreddit) if subscribe else None
+        )
+        with SubredditsUtils._subscriptions_lock(client_org.id) as locked:
+            subscriptions_cache.set(f'{client_org.id}_generation', uuid.uuid4().hex)
+            subscriptions = subscriptions_cache.get(client_org.id)
+            if subscriptions is None:
+                return
+            if not locked:
+                # Can't update it safely, the next get fetches it again
+                subscriptions_cache.delete(client_org.id)
+                return
+            subscriptions = [sub for sub in subscriptions if sub['id'] != subreddit.id]
+            if subscribe:
+                subscriptions.append(subreddit_data)
+            subscriptions_cache.set(client_org.id, subscriptions)
+
+    @staticmethod
+    def purge_subscriptions(client_org_id):
+        """
+        Removes the cached subscriptions of the client org, call it when its reddit user changes.
+        """
+        SubredditsUtils._subscriptions_cache.set(
+            f'{client_org_id}_generation', uuid.uuid4().hex
+        )
+        SubredditsUtils._subscriptions_cache.delete(client_org_id)
 
     @staticmethod
     def subscribe_action(reddit, logger, name, client_org, subreddit, subscribe=True):
@@ -74,6 +229,20 @@ class SubredditsUtils(object):
                 )
                 status_code = status.HTTP_503_SERVICE_UNAVAILABLE
                 logger.error(msg)
+            if status_code == status.HTTP_200_OK:
+                # Done in Reddit already, the cached list is best effort and never fails it
+                try:
+                    SubredditsUtils._write_subscription(client_org, subreddit, subscribe)
+                except Exception as ex:
+                    logger.warning(
+                        f'Could not update the cached subscriptions of u/{redditor_name}. '
+                        f'Exception raised: {repr(ex)}.'
+                    )
+                    try:
+                        SubredditsUtils.purge_subscriptions(client_org.id)
+                    except Exception:
+                        # Still cached, it expires in SUBSCRIPTIONS_TTL seconds
+                        pass
         else:
             msg = (
                 f'Reddit instance is read only. Cannot '
@@ -83,6 +252,24 @@ class SubredditsUtils(object):
             logger.warn(msg)
         return status_code, msg
 
+    @staticmethod
+    @contextmanager
+    def unavailable_as_not_found(subreddit):
+        """
+        Turns the Reddit errors of a subreddit that is not available anymore (banned, made
+        private...) into a 404, and forgets its cached resolution and details.
+        Use it around the requests made with the lazy instances get_sub_if_available() returns.
+        """
+        try:
+            yield
+        except (Redirect, NotFound, Forbidden):
+            name = subreddit.display_name
+            SubredditsUtils._resolutions_cache.delete(name.lower())
+            SubredditsUtils._details_cache.delete(name.lower())
+            raise exceptions.NotFound(
+                detail={'detail': f'No subreddit exists with the name: {name}.'}
+            )
+
     @staticmethod
     def check_and_get_sub(subreddit_name, reddit):
         if not subreddit_name or not isinstance(subreddit_name, str):
@@ -122,6 +309,192 @@ class SubredditsUtils(object):
             'can_assign_user_flair': subreddit.can_assign_user_flair,
         }
 
+    @staticmethod
+    def get_cached_subreddit_data(name):
+        """
+        Returns a (subreddit_data, etag, stale) tuple from the details cache, or None if not
+        cached.
+        """
+        entry = SubredditsUtils._details_cache.get(name.lower())
+        if entry is None:
+            return None
+        return entry['data'], entry['etag'], entry['fresh_until'] < time.time()
+
+    @staticmethod
+    def cache_subreddit_data(subreddit, subreddit_data):
+        """
+        Keeps the subreddit data in cache, fresh for SUBREDDIT_DETAILS_FRESH_TTL seconds and
+        served stale up to SUBREDDIT_DETAILS_STALE_TTL seconds. Private and quarantined
+        subreddits are never cached, not every user can see them.
+        """
+        if subreddit.subreddit_type == 'private' or getattr(
+            subreddit, 'quarantine', False
+        ):
+            return
+        SubredditsUtils._details_cache.set(
+            subreddit_data['display_name'].lower(),
+            {
+                'data': subreddit_data,
+                'etag': Utils.make_etag(subreddit_data),
+                'fresh_until': time.time() + settings.SUBREDDIT_DETAILS_FRESH_TTL,
+            },
+        )
+
+    @staticmethod
+    def revalidate_subreddit_data(name, reddit):
+        """
+        Refreshes the cached subreddit data in background and enqueues its Subreddit object update. Only one
+        worker does it at a time for each subreddit.
+        """
+        lock_key = f'{name.lower()}_revalidating'
+        if SubredditsUtils._details_cache.add(
+            lock_key, True, settings.SUBREDDIT_DETAILS_REVALIDATE_TIMEOUT
+        ):
+            Utils.run_in_background(
+                SubredditsUtils._revalidate_subreddit_data, name, reddit, lock_key
+            )
+
+    @staticmethod
+    def _revalidate_subreddit_data(name, reddit, lock_key):
+        try:
+            subreddit = SubredditsUtils.get_sub_if_available(name, reddit)
+            if subreddit is None:
+                # Not available anymore, stop serving it
+                SubredditsUtils._details_cache.delete(name.lower())
+                return
+            subreddit_data = SubredditsUtils.get_subreddit_data(subreddit)
+            SubredditsUtils.enqueue_save(subreddit_data)
+            SubredditsUtils.cache_subreddit_data(subreddit, subreddit_data)
+        except exceptions.NotFound:
+            # Its cached resolution and details are already gone
+            pass
+        finally:
+            SubredditsUtils._details_cache.delete(lock_key)
+
+    @staticmethod
+    def get_cached_rules(name):
+        """
+        Returns a (rules, etag) tuple from the rules cache, or None if not cached.
+        """
+        entry = SubredditsUtils._rules_cache.get(name.lower())
+        if entry is None:
+            return None
+        return entry['rules'], entry['etag']
+
+    @staticmethod
+    def cache_rules(subreddit, rules):
+        """
+        Keeps the subreddit rules in cache SUBREDDIT_RULES_TTL seconds, they rarely change.
+        Use purge_rules() to drop them before. Private subreddits rules are never cached.
+        """
+        # Lazy instances come from the name resolutions cache, which only has public ones
+        if subreddit._fetched and (
+            subreddit.subreddit_type == 'private' or getattr(subreddit, 'quarantine', False)
+        ):
+            return
+        SubredditsUtils._rules_cache.set(
+            subreddit.display_name.lower(),
+            {'rules': rules, 'etag': Utils.make_etag(rules)},
+        )
+
+    @staticmethod
+    def purge_rules(name):
+        # The other workers may serve their local copy up to CACHE_LOCAL_TTL seconds more
+        SubredditsUtils._rules_cache.delete(name.lower())
+
+    @staticmethod
+    def get_submissions_listing(subreddit, sort, time_filter, limit, **generator_kwargs):
+        if sort == 'hot':
+            return subreddit.hot(limit=limit, **generator_kwargs)
+        elif sort == 'rising':
+            return subreddit.rising(limit=limit, **generator_kwargs)
+        elif sort == 'new':
+            return subreddit.new(limit=limit, **generator_kwargs)
+        elif sort == 'gilded':
+            return subreddit.gilded(limit=limit, **generator_kwargs)
+        elif sort == 'controversial':
+            return subreddit.controversial(
+                time_filter=time_filter, limit=limit, **generator_kwargs
+            )
+        else:
+            return subreddit.top(time_filter=time_filter, limit=limit, **generator_kwargs)
+
+    @staticmethod
+    def _window_key(subreddit, sort, time_filter):
+        if sort not in ('controversial', 'top'):
+            time_filter = None
+        return f'{subreddit.display_name.lower()}_{sort}_{time_filter}'
+
+    @staticmethod
+    def get_submissions_window(subreddit, sort, time_filter, size):
+        """
+        Returns the first size submissions (simple data) of the subreddit listing, or less if the
+        listing has no more. The listing window is shared in cache for SUBMISSIONS_WINDOW_TTL
+        seconds and extended from its last submission with the after cursor when a request needs
+        more of it, so the submissions already fetched are never requested again. Extending it
+        keeps its expiry, a window paged all the time is still built again every TTL.
+        """
+        key = SubredditsUtils._window_key(subreddit, sort, time_filter)
+        window = SubredditsUtils._windows_cache.get(key)
+        # Seconds the window has left, the extensions must not renew it
+        remaining = (
+            int(window['created_at'] + SubredditsUtils._windows_cache.ttl - time.time())
+            if window is not None
+            else 0
+        )
+        if remaining <= 0:
+            window = {'items': [], 'complete': False, 'created_at': time.time()}
+            remaining = SubredditsUtils._windows_cache.ttl
+        items = window['items']
+        if len(items) >= size or window['complete']:
+            return items[:size]
+
+        # Ask for a few more than needed, the next page probably comes next
+        limit = max(size - len(items), settings.SUBMISSIONS_WINDOW_BATCH)
+        params = {'after': items[-1]['name']} if items else {}
+        with SubredditsUtils.unavailable_as_not_found(subreddit):
+            new_items = [
+                SubmissionsUtils.get_submission_data_simple(submission)
+                for submission in SubredditsUtils.get_submissions_listing(
+                    subreddit, sort, time_filter, limit, params=params
+                )
+            ]
+        window = {
+            'items': items + new_items,
+            'complete': len(new_items) < limit,
+            'created_at': window['created_at'],
+        }
+        SubredditsUtils._windows_cache.set(key, window, remaining)
+        return window['items'][:size]
+
+    @staticmethod
+    def get_submissions_page(subreddit, sort, time_filter, limit, after=None, before=None):
+        """
+        Returns up to limit submissions (simple data) after or before the submission fullname
+        provided, with one listing request at most. Pages after a submission of the cached
+        listing window are served from the window when it has them.
+        """
+        if before is None:
+            window = SubredditsUtils._windows_cache.get(
+                SubredditsUtils._window_key(subreddit, sort, time_filter)
+            )
+            if window is not None:
+                names = [item['name'] for item in window['items']]
+                if after in names:
+                    start = names.index(after) + 1
+                    page = window['items'][start : start + limit]
+                    if len(page) == limit or window['complete']:
+                        return page
+
+        params = {'before': before} if before else {'after': after}
+        with SubredditsUtils.unavailable_as_not_found(subreddit):
+            return [
+                SubmissionsUtils.get_submission_data_simple(submission)
+                for submission in SubredditsUtils.get_submissions_listing(
+                    subreddit, sort, time_filter, limit, params=params
+                )
+            ]
+
     @staticmethod
     def get_subreddit_data_simple(subreddit):
         return {
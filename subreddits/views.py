@@ -35,16 +35,8 @@ class SubredditsSubscriptions(APIView):
         logger.info(f'Subreddits subscriptions for client =>')
 
         # Gets the reddit instance from the user in request (ClientOrg)
-        reddit, _ = Utils.new_client_request(request.user)
-
-        if reddit.read_only:
-            subreddits = []
-        else:
-            reddit_user = reddit.user
-            subreddits = [
-                SubredditsUtils.get_subreddit_data_simple(sub)
-                for sub in reddit_user.subreddits()
-            ]
+        reddit, client_org = Utils.new_client_request(request.user)
+        subreddits = SubredditsUtils.get_subscriptions(reddit, client_org)
 
         return Response({'subscriptions': subreddits}, status=status.HTTP_200_OK)
 
@@ -60,9 +52,8 @@ class SubredditsSubscriptions(APIView):
 
         # Get data I need from subreddit instance
         subreddit_data = SubredditsUtils.get_subreddit_data(subreddit)
-        # TODO: Here for now I'll just save the subreddit_data in a Subreddit Model object
-        # But I need to enqueue this into a redis queue, send the data to user as fast as possible
-        SubredditsUtils.create_or_update(subreddit_data)
+        # The Subreddit object is saved by the jobs worker, no need to wait for it
+        SubredditsUtils.enqueue_save(subreddit_data)
 
         status_code, msg = SubredditsUtils.subscribe_action(
             reddit, logger, subreddit_name, client_org, subreddit, subscribe
@@ -97,6 +88,19 @@ class SubredditDetails(APIView):
 
         # Gets the reddit instance from the user in request (ClientOrg)
         reddit, _ = Utils.new_client_request(request.user)
+
+        # Serve the cached data even if stale, it gets refreshed in background
+        cached = SubredditsUtils.get_cached_subreddit_data(name)
+        if cached is not None:
+            subreddit_data, etag, stale = cached
+            if stale:
+                SubredditsUtils.revalidate_subreddit_data(name, reddit)
+            # No need to render the payload if the client already has it
+            not_modified = Utils.not_modified(request, etag)
+            if not_modified is not None:
+                return not_modified
+            return Response(subreddit_data, status=status.HTTP_200_OK)
+
         # Get subreddit instance with the name provided
         subreddit = SubredditsUtils.get_sub_if_available(name, reddit)
         if subreddit is None:
@@ -106,8 +110,9 @@ class SubredditDetails(APIView):
 
         # Get data I need from subreddit instance
         subreddit_data = SubredditsUtils.get_subreddit_data(subreddit)
-        # TODO: Enqueue this in a redis queue job later
-        SubredditsUtils.create_or_update(subreddit_data)
+        # Only written on a cache miss, the background refresh keeps it updated after that
+        SubredditsUtils.enqueue_save(subreddit_data)
+        SubredditsUtils.cache_subreddit_data(subreddit, subreddit_data)
 
         return Response(subreddit_data, status=status.HTTP_200_OK)
 
@@ -156,8 +161,7 @@ class SubredditConnections(APIView):
 
         # Get data I need from subreddit instance
         subreddit_data = SubredditsUtils.get_subreddit_data(subreddit)
-        # TODO: Here for now I'll just save the subreddit_data in a Subreddit Model object
-        # But I need to enqueue this into a redis queue, send the data to user as fast as possible
+        # Saved here and not by the jobs worker, the disconnection needs it to be in order
         subreddit_obj = SubredditsUtils.create_or_update(subreddit_data)
         # Add the client_org connection to the object
         subreddit_obj.clients.add(client_org)
@@ -202,7 +206,9 @@ class SubredditConnections(APIView):
 
 class SubredditRules(APIView):
     """
-    API endpoint to get the rules of a subreddit by name.
+    API endpoint to get the rules of a subreddit by name.\n
+    GET returns the subreddit rules, cached for a long time as they rarely change.\n
+    DELETE purges the cached rules of the subreddit, so the next GET gets them from Reddit.\n
     """
 
     authentication_classes = [MyTokenAuthentication, SessionAuthentication]
@@ -214,6 +220,15 @@ class SubredditRules(APIView):
 
         # Gets the reddit instance from the user in request (ClientOrg)
         reddit, _ = Utils.new_client_request(request.user)
+
+        cached = SubredditsUtils.get_cached_rules(name)
+        if cached is not None:
+            rules, etag = cached
+            not_modified = Utils.not_modified(request, etag)
+            if not_modified is not None:
+                return not_modified
+            return Response(rules, status=status.HTTP_200_OK)
+
         # Get subreddit instance with the name provided
         subreddit = SubredditsUtils.get_sub_if_available(name, reddit)
         if subreddit is None:
@@ -221,23 +236,43 @@ class SubredditRules(APIView):
                 detail={'detail': f'No subreddit exists with the name: {name}.'}
             )
 
-        return Response(subreddit.rules(), status=status.HTTP_200_OK)
+        with SubredditsUtils.unavailable_as_not_found(subreddit):
+            rules = subreddit.rules()
+        SubredditsUtils.cache_rules(subreddit, rules)
+        return Response(rules, status=status.HTTP_200_OK)
+
+    def delete(self, request, name, Format=None):
+        logger.info('-' * 100)
+        logger.info(f'Subreddit "{name}" rules purge =>')
+
+        SubredditsUtils.purge_rules(name)
+        return Response(
+            {'detail': f'Cached rules of r/{name} purged.'}, status=status.HTTP_200_OK
+        )
 
 
 class SubredditSubmissions(APIView):
     """
         API endpoint to access Subreddit's submissions -> subreddits/:name/submissions\n
-        GET returns a max of 5 submissions per request. Uses offset to get the rest in different request.\n
+        GET returns a max of limit submissions per request. Uses the next cursor (or offset) to get the rest in different request.\n
         URL query params:\n
                     sort=[controversial|gilded|hot|new|rising|top] (default=hot)
                     time_filter=[all|day|hour|month|week|year] (default=all)
-                    offset=[0<=int<11] (default=0)
-                    time_filter only used when sort=[controversial|top]
-        POST allows to submit a text, link, ~~image or video~~ submission to a subreddit.\n
+                    limit=[1<=int<=100] (default=5)
+                    after=[string] -- The next cursor from a previous response.
+                    before=[string] -- The previous cursor from a previous response.
+                    offset=[0<=int] (default=0)
+                    time_filter only used when sort=[controversial|top], offset ignored when a cursor is provided
+        POST allows to submit a text, link, image or video submission to a subreddit.\n
+        Image and video submissions are accepted as jobs (202), get their status and final submission id from submissions/jobs/:id\n
         JSON data params:\n
                     title=[string] –- The title of the submission.
                     selftext=[string] –- The Markdown formatted content for a text submission. Use an empty string, '', to make a title-only submission.
                     url=[string] –- The URL for a link submission.
+                    image_path=[string] -- The path to an image, to upload and post.
+                    video_path=[string] -- The path to a video, to upload and post.
+                    videogif=[bool] -- When True, the video is treated as a gif, with no sound (default: False).
+                    thumbnail_path=[string] -- The path to an image, to be uploaded and used as the video thumbnail.
                     flair_id=[string] -- The flair template to select (default: None)
                     flair_text=[string] -- If the template’s flair_text_editable value is True, this value will set a custom text (default: None).
                     resubmit=[bool] -- When False, an error will occur if the URL has already been submitted (default: True).
@@ -253,7 +288,7 @@ class SubredditSubmissions(APIView):
     _sortings = ['controversial', 'gilded', 'hot', 'new', 'rising', 'top']
     _time_filters = ['all', 'day', 'hour', 'month', 'week', 'year']
 
-    def _validate_query_params(self, sort, time_filter, offset):
+    def _validate_query_params(self, sort, time_filter, limit, offset):
         if sort not in self._sortings:
             raise exceptions.ParseError(detail={'detail': f'Sort type {sort} invalid.'})
         elif sort == 'controversial' or sort == 'top':
@@ -273,22 +308,20 @@ class SubredditSubmissions(APIView):
             raise exceptions.ParseError(
                 detail={'detail': f'offset parameter must be an integer.'}
             )
+        try:
+            limit = int(limit)
+            if limit < 1 or limit > 100:
+                raise exceptions.ParseError(
+                    detail={
+                        'detail': f'Limit {limit} outside allowed range (1<=limit<=100).'
+                    }
+                )
+        except ValueError:
+            raise exceptions.ParseError(
+                detail={'detail': f'limit parameter must be an integer.'}
+            )
 
-        return offset
-
-    def _get_submissions(self, subreddit, sort, time_filter, limit):
-        if sort == 'hot':
-            return subreddit.hot(limit=limit)
-        elif sort == 'rising':
-            return subreddit.rising(limit=limit)
-        elif sort == 'new':
-            return subreddit.new(limit=limit)
-        elif sort == 'gilded':
-            return subreddit.gilded(limit=limit)
-        elif sort == 'controversial':
-            return subreddit.controversial(time_filter=time_filter, limit=limit)
-        else:
-            return subreddit.top(time_filter=time_filter, limit=limit)
+        return limit, offset
 
     def get(self, request, name, Format=None):
         logger.info('-' * 100)
@@ -305,23 +338,33 @@ class SubredditSubmissions(APIView):
 
         sort = request.query_params.get('sort', 'hot')
         time_filter = request.query_params.get('time_filter', 'all')
+        limit = request.query_params.get('limit', 5)
         offset = request.query_params.get('offset', 0)
+        after = request.query_params.get('after')
+        before = request.query_params.get('before')
 
-        offset = self._validate_query_params(sort, time_filter, offset)
+        limit, offset = self._validate_query_params(sort, time_filter, limit, offset)
         logger.info(f'Sort type: {sort}')
         logger.info(f'Time filter: {time_filter}')
-        logger.info(f'offset: {offset}')
-
-        # Get submissions generator according to query_params and with the limit + offset?
-        submissions_generator = self._get_submissions(
-            subreddit, sort, time_filter, offset + 5
-        )
-
-        submissions = [
-            SubmissionsUtils.get_submission_data_simple(sub)
-            for index, sub in enumerate(submissions_generator, start=1)
-            if index > offset
-        ]
+        logger.info(f'limit: {limit}')
+
+        if after or before:
+            # Cursor pages cost one listing request at most, no matter how deep they are
+            offset = 0
+            submissions = SubredditsUtils.get_submissions_page(
+                subreddit,
+                sort,
+                time_filter,
+                limit,
+                after=Utils.decode_cursor(after, 't3') if after else None,
+                before=Utils.decode_cursor(before, 't3') if before else None,
+            )
+        else:
+            logger.info(f'offset: {offset}')
+            # The offset slice comes from the cached listing window, extended only if needed
+            submissions = SubredditsUtils.get_submissions_window(
+                subreddit, sort, time_filter, offset + limit
+            )[offset:]
         logger.info(f'Total submissions: {len(submissions)}')
 
         return Response(
@@ -329,7 +372,14 @@ class SubredditSubmissions(APIView):
                 'submissions': submissions,
                 'sort_type': sort,
                 'time_filter': time_filter,
+                'limit': limit,
                 'offset': offset,
+                'next': Utils.encode_cursor(submissions[-1]['name'])
+                if len(submissions) == limit
+                else None,
+                'previous': Utils.encode_cursor(submissions[0]['name'])
+                if submissions and (after or before or offset)
+                else None,
             },
             status=status.HTTP_200_OK,
         )
@@ -385,68 +435,63 @@ class SubredditSubmissions(APIView):
 
         status_code = status.HTTP_201_CREATED
         submission_data = None
-        if not reddit.read_only:
+        job = None
+        if reddit.read_only:
+            msg = f'Reddit instance is read only. Cannot submit a post creation in r/{name}.'
+            status_code = status.HTTP_405_METHOD_NOT_ALLOWED
+            logger.warn(msg)
+        elif selftext or url:
             try:
-                submission = None
-                if selftext or url:
-                    submission = subreddit.submit(
-                        title,
-                        selftext,
-                        url,
-                        flair_id,
-                        flair_text,
-                        resubmit,
-                        send_replies,
-                        nsfw,
-                        spoiler,
-                        collection_id,
-                    )
-                elif image_path:
-                    # Not waiting the response here.. Not using websockets
-                    subreddit.submit_image(
-                        title,
-                        image_path,
-                        flair_id,
-                        flair_text,
-                        resubmit,
-                        send_replies,
-                        nsfw,
-                        spoiler,
-                        collection_id=collection_id,
-                        without_websockets=True,
-                    )
-                else:
-                    # Not waiting the response here.. Not using websockets
-                    subreddit.submit_video(
-                        title,
-                        video_path,
-                        videogif,
-                        thumbnail_path,
-                        flair_id,
-                        flair_text,
-                        resubmit,
-                        send_replies,
-                        nsfw,
-                        spoiler,
-                        collection_id=collection_id,
-                        without_websockets=True,
-                    )
+                submission = subreddit.submit(
+                    title,
+                    selftext,
+                    url,
+                    flair_id,
+                    flair_text,
+                    resubmit,
+                    send_replies,
+                    nsfw,
+                    spoiler,
+                    collection_id,
+                )
                 _, redditor_name = ClientsUtils.get_redditor_id_name(client_org)
-                if submission:
-                    msg = f'New text/link submission created in r/{name} by u/{redditor_name} with id: {submission.id}.'
-                    submission_data = SubmissionsUtils.get_submission_data(submission)
-                else:
-                    msg = f'New image/video/gif submission created in r/{name} by u/{redditor_name}.'
+                msg = f'New text/link submission created in r/{name} by u/{redditor_name} with id: {submission.id}.'
+                submission_data = SubmissionsUtils.get_submission_data(submission)
                 logger.info(msg)
             except Exception as ex:
                 msg = f'Error creating submission. Exception raised: {repr(ex)}.'
                 status_code = status.HTTP_503_SERVICE_UNAVAILABLE
                 logger.error(msg)
         else:
-            msg = f'Reddit instance is read only. Cannot submit a post creation in r/{name}.'
-            status_code = status.HTTP_405_METHOD_NOT_ALLOWED
-            logger.warn(msg)
+            # The media upload can take long, it's done by the jobs worker
+            options = {
+                'flair_id': flair_id,
+                'flair_text': flair_text,
+                'resubmit': resubmit,
+                'send_replies': send_replies,
+                'nsfw': nsfw,
+                'spoiler': spoiler,
+                'collection_id': collection_id,
+            }
+            if image_path:
+                kind, media = 'image', {'image_path': image_path}
+            else:
+                kind, media = (
+                    'video',
+                    {
+                        'video_path': video_path,
+                        'videogif': videogif,
+                        'thumbnail_path': thumbnail_path,
+                    },
+                )
+            job = SubmissionsUtils.enqueue_media_submission(
+                client_org, subreddit.display_name, kind, title, media, options
+            )
+            msg = f'New image/video/gif submission to r/{name} accepted with job id: {job["id"]}.'
+            status_code = status.HTTP_202_ACCEPTED
+            logger.info(msg)
 
         return Response(
-            {'detail': msg, 'submission': submission_data}, status=status_code
+            {'detail': msg, 'submission': submission_data, 'job': job},
+            status=status_code,
         )